@@ -1,17 +1,25 @@
 """Flask API backend for Trading Dataset Generator."""
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-import jsonlines
-import uuid
+import os
 import random
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
 from pathlib import Path
 from datetime import datetime
 
 from src.generators.pinescript import generate_pinescript
 from src.generators.price_action import generate_price_action
 from src.generators.institutional import generate_institutional
-from src.generators.ohlc import generate_ohlc_snippet
-from src.schemas import TrainingExample
+from src.generators.ohlc import batch_to_bars, generate_ohlc_batch
+from src.catalog import catalog_for, record_dataset
+from src.engine import generate_to_file, iter_samples, weighted_distribution
+from src.jobs import JobManager
+from src.serialization import (BUFFER_SIZE, compression_for, dumps, gzip_chunks, iter_jsonl_chunks,
+                               open_dataset, strip_compression, with_compression)
+from src.validation import validate_file, validate_lines
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
@@ -19,6 +27,9 @@ CORS(app)  # Enable CORS for frontend communication
 # Ensure datasets directory exists
 Path("datasets").mkdir(exist_ok=True)
 
+# Background generation jobs, several of which may run concurrently
+jobs = JobManager(max_workers=4)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -27,136 +38,307 @@ def health_check():
         'timestamp': datetime.now().isoformat()
     })
 
-@app.route('/api/preview/<category>', methods=['GET'])
-def preview_sample(category):
-    """Generate a preview sample for a specific category."""
-    try:
-        seed = request.args.get('seed', type=int, default=None)
-        
-        generators = {
-            'pinescript': generate_pinescript,
-            'price_action': generate_price_action,
-            'institutional': generate_institutional
-        }
-        
-        if category not in generators:
-            return jsonify({'error': f'Invalid category: {category}'}), 400
+# Largest ``n`` a preview request may ask for
+MAX_PREVIEW_SAMPLES = 100
+
+# Largest ``num_bars`` per OHLC preview series
+MAX_PREVIEW_BARS = 500
+
+# Encoded responses kept by each preview cache; one n=100 OHLC batch of
+# MAX_PREVIEW_BARS bars is about 5 MB
+PREVIEW_CACHE_BYTES = 32 * 1024 * 1024
+
+def _bytes_cache(max_bytes):
+    """Like ``lru_cache`` for functions returning bytes, bounded by total size."""
+    def decorate(fn):
+        entries = OrderedDict()
+        lock = threading.Lock()
+        size = 0
         
-        data = generators[category](seed=seed)
-        return jsonify(data)
+        @wraps(fn)
+        def cached(*args):
+            nonlocal size
+            with lock:
+                if args in entries:
+                    entries.move_to_end(args)
+                    return entries[args]
+            body = fn(*args)
+            with lock:
+                if args not in entries and len(body) <= max_bytes:
+                    entries[args] = body
+                    size += len(body)
+                    while size > max_bytes:
+                        size -= len(entries.popitem(last=False)[1])
+            return body
+        return cached
+    return decorate
+
+PREVIEW_GENERATORS = {
+    'pinescript': generate_pinescript,
+    'price_action': generate_price_action,
+    'institutional': generate_institutional
+}
+
+@_bytes_cache(PREVIEW_CACHE_BYTES)
+def _preview_batch(category, seed, n):
+    """Encoded JSON for ``n`` samples with seeds ``seed .. seed + n - 1``.
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    Generators are deterministic per seed, so seeded batches are cached.
+    """
+    generate = PREVIEW_GENERATORS[category]
+    samples = [generate(seed=seed + i) for i in range(n)]
+    return dumps({'category': category, 'seed': seed, 'n': n, 'samples': samples})
+
+@_bytes_cache(PREVIEW_CACHE_BYTES)
+def _preview_ohlc_batch(pattern, num_bars, seed, n):
+    """Encoded JSON for ``n`` OHLC series drawn in one vectorized batch.
+    
+    Bar timestamps end at the time the batch was first generated.
+    """
+    batch = generate_ohlc_batch(pattern, n, num_bars, seed=seed)
+    series = [batch_to_bars(batch, i) for i in range(n)]
+    return dumps({'pattern': pattern, 'seed': seed, 'n': n, 'series': series})
 
+def _preview_params():
+    """Read ``n`` and ``seed``; unseeded requests get a random seed and skip the cache."""
+    n = request.args.get('n', type=int, default=1)
+    if not 1 <= n <= MAX_PREVIEW_SAMPLES:
+        raise ValueError(f'n must be between 1 and {MAX_PREVIEW_SAMPLES}')
+    seed = request.args.get('seed', type=int, default=None)
+    return n, seed
+
+def _json_response(body):
+    return Response(body, mimetype='application/json')
+
+# Registered before ``/api/preview/<category>`` so "ohlc" is never taken for a category
 @app.route('/api/preview/ohlc', methods=['GET'])
 def preview_ohlc():
-    """Generate OHLC preview."""
+    """Generate OHLC previews as ``{"pattern", "seed", "n", "series"}``."""
     try:
         pattern = request.args.get('pattern', 'breakout')
         num_bars = request.args.get('num_bars', type=int, default=10)
-        seed = request.args.get('seed', type=int, default=None)
+        if not 1 <= num_bars <= MAX_PREVIEW_BARS:
+            raise ValueError(f'num_bars must be between 1 and {MAX_PREVIEW_BARS}')
+        n, seed = _preview_params()
+        
+        if seed is None:
+            return _json_response(_preview_ohlc_batch.__wrapped__(pattern, num_bars, random.randint(1, 999999), n))
+        return _json_response(_preview_ohlc_batch(pattern, num_bars, seed, n))
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/preview/<category>', methods=['GET'])
+def preview_sample(category):
+    """Generate preview samples for a specific category.
+    
+    Without ``n`` a single sample is returned as before; with ``n`` the
+    response is ``{"category", "seed", "n", "samples"}`` where sample ``i``
+    used seed ``seed + i``.
+    """
+    try:
+        if category not in PREVIEW_GENERATORS:
+            return jsonify({'error': f'Invalid category: {category}'}), 400
         
-        data = generate_ohlc_snippet(pattern, num_bars=num_bars, seed=seed)
-        return jsonify({'pattern': pattern, 'bars': data})
+        n, seed = _preview_params()
+        if 'n' not in request.args:
+            return jsonify(PREVIEW_GENERATORS[category](seed=seed))
+        
+        if seed is None:
+            return _json_response(_preview_batch.__wrapped__(category, random.randint(1, 999999), n))
+        return _json_response(_preview_batch(category, seed, n))
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Largest ``shards`` a generation request may ask for
+MAX_GENERATE_SHARDS = 64
+
+def _worker_count(config):
+    """Read ``workers`` (at least 1), capped at the CPU count."""
+    workers = int(config.get('workers', 1))
+    if workers < 1:
+        raise ValueError('workers must be at least 1')
+    return min(workers, os.cpu_count() or 1)
+
+def _pool_size(config):
+    """Read ``shards`` and ``workers`` for a generation request."""
+    shards = int(config.get('shards', 1))
+    if not 1 <= shards <= MAX_GENERATE_SHARDS:
+        raise ValueError(f'shards must be between 1 and {MAX_GENERATE_SHARDS}')
+    return shards, _worker_count(config)
+
+# Largest ``seed`` a generation request may pass (row seeds are ``seed + i``)
+MAX_SEED = 2 ** 32 - 1
+
+def _generation_plan(config):
+    """Resolve the category distribution and seed from a request config.
+    
+    Accepts JSON bodies as well as query-string values (all strings).
+    Raises ``ValueError`` for malformed or out-of-range values.
+    """
+    dataset_size = int(config.get('size', 100))
+    if dataset_size < 1:
+        raise ValueError('size must be at least 1')
+    seed_value = int(config.get('seed', 0))
+    if not 0 <= seed_value <= MAX_SEED:
+        raise ValueError(f'seed must be between 0 and {MAX_SEED}')
+    balance_categories = config.get('balance', True)
+    if isinstance(balance_categories, str):
+        balance_categories = balance_categories.lower() not in ('0', 'false', 'no')
+    
+    # Category weights
+    if balance_categories:
+        pine_weight = price_weight = inst_weight = 33.33
+    else:
+        pine_weight = float(config.get('pine_weight', 30))
+        price_weight = float(config.get('price_weight', 40))
+        inst_weight = float(config.get('inst_weight', 30))
+        if min(pine_weight, price_weight, inst_weight) < 0:
+            raise ValueError('weights must not be negative')
+    
+    # Setup seed
+    actual_seed = seed_value if seed_value > 0 else random.randint(1, 999999)
+    
+    distribution = weighted_distribution(dataset_size, {
+        'pinescript': pine_weight,
+        'price_action': price_weight,
+        'institutional': inst_weight
+    })
+    return distribution, actual_seed
+
 @app.route('/api/generate', methods=['POST'])
 def generate_dataset():
-    """Generate a complete dataset."""
+    """Queue dataset generation as a background job (poll ``/api/jobs/<id>``)."""
     try:
         config = request.json
         
-        dataset_size = config.get('size', 100)
-        seed_value = config.get('seed', 0)
-        balance_categories = config.get('balance', True)
+        distribution, actual_seed = _generation_plan(config)
+        shards, workers = _pool_size(config)
         output_name = config.get('filename', f'trading_dataset_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl')
+        output_name = with_compression(output_name, config.get('compression'))
         
-        # Category weights
-        if balance_categories:
-            pine_weight = price_weight = inst_weight = 33.33
-        else:
-            pine_weight = config.get('pine_weight', 30)
-            price_weight = config.get('price_weight', 40)
-            inst_weight = config.get('inst_weight', 30)
-        
-        # Setup seed
-        actual_seed = seed_value if seed_value > 0 else random.randint(1, 999999)
-        random.seed(actual_seed)
-        
-        distribution = {
-            'pinescript': int(dataset_size * pine_weight / 100),
-            'price_action': int(dataset_size * price_weight / 100),
-            'institutional': int(dataset_size * inst_weight / 100)
-        }
-        
-        generators = {
-            'pinescript': generate_pinescript,
-            'price_action': generate_price_action,
-            'institutional': generate_institutional
-        }
-        
-        # Generate samples
-        samples = []
-        progress = []
-        
-        for category, count in distribution.items():
-            for i in range(count):
-                sample_seed = random.randint(0, 1000000)
-                data = generators[category](seed=sample_seed)
-                
-                example = TrainingExample(
-                    id=str(uuid.uuid4()),
-                    instruction=data['instruction'],
-                    response=data['response'],
-                    pattern_type=data['pattern_type'],
-                    timeframe=data.get('timeframe'),
-                    seed=sample_seed,
-                    metadata=data.get('metadata', {})
-                )
-                samples.append(example.model_dump())
-        
-        # Shuffle and save
-        random.shuffle(samples)
         output_path = Path("datasets") / output_name
         
-        with jsonlines.open(output_path, mode='w') as writer:
-            writer.write_all(samples)
+        def run(job):
+            # Generate samples (optionally sharded across worker processes)
+            written = generate_to_file(
+                distribution, actual_seed, str(output_path),
+                shards=shards, workers=workers, progress=job.advance
+            )
+            record_dataset(str(output_path), written, distribution, {
+                'seed': actual_seed, 'shards': shards, 'config': config
+            })
+            return {
+                'success': True,
+                'samples_generated': written,
+                'filename': output_name,
+                'path': str(output_path),
+                'seed_used': actual_seed,
+                'distribution': distribution
+            }
         
-        return jsonify({
-            'success': True,
-            'samples_generated': len(samples),
+        job = jobs.submit('generate', sum(distribution.values()), {
             'filename': output_name,
-            'path': str(output_path),
-            'seed_used': actual_seed,
+            'seed': actual_seed,
             'distribution': distribution
-        })
+        }, run)
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': f'/api/jobs/{job.id}',
+            'job': job.to_dict()
+        }), 202
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stream', methods=['GET', 'POST'])
+def stream_dataset():
+    """Generate rows on the fly and stream them as chunked JSONL or SSE.
+    
+    Takes the same options as ``/api/generate`` (JSON body or query string)
+    plus ``format`` (``jsonl`` or ``sse``) and ``gzip`` for compressed JSONL.
+    Nothing is written under ``datasets/``.
+    """
+    try:
+        config = request.get_json(silent=True) or request.args
+        distribution, actual_seed = _generation_plan(config)
+        stream_format = config.get('format', 'jsonl')
+        rows = iter_samples(distribution, actual_seed)
+        headers = {'X-Seed': str(actual_seed), 'X-Total-Rows': str(sum(distribution.values()))}
+        
+        if stream_format == 'sse':
+            def events():
+                count = 0
+                for row in rows:
+                    count += 1
+                    yield b'data: ' + dumps(row) + b'\n\n'
+                yield b'event: end\ndata: ' + dumps({'rows': count, 'seed': actual_seed}) + b'\n\n'
+            headers['Cache-Control'] = 'no-cache'
+            return Response(stream_with_context(events()), mimetype='text/event-stream', headers=headers)
+        
+        if stream_format != 'jsonl':
+            return jsonify({'error': f'Invalid format: {stream_format}'}), 400
+        
+        body = iter_jsonl_chunks(rows)
+        filename = config.get('filename', f'trading_dataset_{actual_seed}.jsonl')
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if str(config.get('gzip', '')).lower() in ('1', 'true', 'yes'):
+            body = gzip_chunks(body)
+            headers['Content-Encoding'] = 'gzip'
+        return Response(stream_with_context(body), mimetype='application/x-ndjson', headers=headers)
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List queued, running and recently finished jobs."""
+    return jsonify({'jobs': [job.to_dict() for job in jobs.list()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a job's status, progress, rows/sec and ETA."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/datasets', methods=['GET'])
 def list_datasets():
     """List all generated datasets."""
     try:
-        datasets_dir = Path("datasets")
         datasets = []
         
-        for file_path in datasets_dir.glob("*.jsonl"):
-            stat = file_path.stat()
-            
-            # Count lines
-            with open(file_path, 'r') as f:
-                line_count = sum(1 for _ in f)
-            
+        # Served from the catalog; only files changed since last seen are rescanned
+        for entry in catalog_for("datasets").list():
             datasets.append({
-                'name': file_path.name,
-                'size_bytes': stat.st_size,
-                'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                'samples': line_count,
-                'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                'name': entry['name'],
+                'size_bytes': entry['size_bytes'],
+                'size_mb': round(entry['size_bytes'] / (1024 * 1024), 2),
+                'samples': entry['samples'],
+                'distribution': entry['distribution'],
+                'provenance': entry['provenance'],
+                'created': entry['created'],
+                'modified': entry['modified']
             })
         
         return jsonify({'datasets': sorted(datasets, key=lambda x: x['modified'], reverse=True)})
@@ -164,14 +346,47 @@ def list_datasets():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _read_chunks(file_path, size=BUFFER_SIZE):
+    """Yield a dataset's JSONL bytes, decompressing stored ``.gz``/``.zst`` files."""
+    with open_dataset(str(file_path)) as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
 @app.route('/api/datasets/<filename>', methods=['GET'])
 def download_dataset(filename):
-    """Download a specific dataset."""
+    """Download a specific dataset.
+    
+    Compressed datasets are sent as stored with a matching
+    ``Content-Encoding`` when the client accepts it (the download is then
+    saved as plain ``.jsonl``) and decompressed on the fly otherwise. Plain
+    datasets are gzipped on the fly for clients that accept gzip.
+    """
     try:
-        file_path = Path("datasets") / filename
+        file_path = (Path("datasets") / filename).resolve()
         if not file_path.exists():
             return jsonify({'error': 'Dataset not found'}), 404
         
+        stored = compression_for(filename)
+        plain_name = Path(strip_compression(filename)).name
+        accepted = request.accept_encodings
+        headers = {'Content-Disposition': f'attachment; filename="{plain_name}"', 'Vary': 'Accept-Encoding'}
+        
+        if stored and accepted[stored]:
+            response = send_file(file_path, mimetype='application/x-ndjson',
+                                 as_attachment=True, download_name=plain_name)
+            response.headers['Content-Encoding'] = stored
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+        if stored:
+            return Response(stream_with_context(_read_chunks(file_path)),
+                            mimetype='application/x-ndjson', headers=headers)
+        if accepted['gzip']:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(stream_with_context(gzip_chunks(_read_chunks(file_path))),
+                            mimetype='application/x-ndjson', headers=headers)
         return send_file(file_path, as_attachment=True)
     
     except Exception as e:
@@ -185,28 +400,26 @@ def validate_dataset():
             return jsonify({'error': 'No file provided'}), 400
         
         file = request.files['file']
-        errors = []
-        valid_count = 0
-        
-        for i, line in enumerate(file.stream):
-            try:
-                import json
-                obj = json.loads(line)
-                TrainingExample(**obj)
-                valid_count += 1
-            except Exception as e:
-                errors.append({
-                    'line': i + 1,
-                    'error': str(e)
-                })
+        workers = _worker_count(request.form)
+        
+        if workers > 1:
+            # Spool the upload so worker processes can read byte ranges of it
+            with tempfile.NamedTemporaryFile(suffix='.jsonl') as spool:
+                file.save(spool)
+                spool.flush()
+                report = validate_file(spool.name, workers=workers, max_errors=50)
+        else:
+            report = validate_lines(file.stream, max_errors=50)
         
         return jsonify({
-            'valid': len(errors) == 0,
-            'valid_count': valid_count,
-            'error_count': len(errors),
-            'errors': errors[:50]  # Return first 50 errors
+            'valid': report['error_count'] == 0,
+            'valid_count': report['valid'],
+            'error_count': report['error_count'],
+            'errors': [{'line': line, 'error': err} for line, err in report['errors']]  # First 50 errors
         })
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,14 +1,14 @@
 """Streamlit web UI for dataset generation."""
 import streamlit as st
-import jsonlines
-import uuid
 import random
 from pathlib import Path
 
 from src.generators.pinescript import generate_pinescript
 from src.generators.price_action import generate_price_action
 from src.generators.institutional import generate_institutional
-from src.schemas import TrainingExample
+from src.catalog import record_dataset
+from src.engine import generate_to_file, weighted_distribution
+from src.validation import validate_lines
 
 st.set_page_config(page_title="Trading Dataset Generator", page_icon="📊", layout="wide")
 
@@ -20,6 +20,8 @@ st.sidebar.header("Configuration")
 dataset_size = st.sidebar.number_input("Dataset Size", min_value=10, max_value=100000, value=100, step=10)
 seed_value = st.sidebar.number_input("Random Seed (0=random)", min_value=0, max_value=999999, value=0)
 balance_categories = st.sidebar.checkbox("Balance Categories", value=True)
+shard_count = st.sidebar.number_input("Shards", min_value=1, max_value=256, value=1)
+worker_count = st.sidebar.number_input("Worker Processes", min_value=1, max_value=64, value=1)
 
 st.sidebar.markdown("---")
 st.sidebar.header("Category Weights")
@@ -53,54 +55,34 @@ with tab1:
         
         # Setup
         actual_seed = seed_value if seed_value > 0 else random.randint(1, 999999)
-        random.seed(actual_seed)
         
-        distribution = {
-            'pinescript': int(dataset_size * pine_weight / 100),
-            'price_action': int(dataset_size * price_weight / 100),
-            'institutional': int(dataset_size * inst_weight / 100)
-        }
+        distribution = weighted_distribution(dataset_size, {
+            'pinescript': pine_weight,
+            'price_action': price_weight,
+            'institutional': inst_weight
+        })
+        total_rows = max(1, sum(distribution.values()))
+        generated = [0]
         
-        generators = {
-            'pinescript': generate_pinescript,
-            'price_action': generate_price_action,
-            'institutional': generate_institutional
-        }
+        def update_progress(rows):
+            generated[0] += rows
+            progress_bar.progress(min(generated[0] / total_rows, 1.0))
         
-        # Generate
-        samples = []
-        total_generated = 0
-        
-        for category, count in distribution.items():
-            status_text.text(f"Generating {category}...")
-            for i in range(count):
-                sample_seed = random.randint(0, 1000000)
-                data = generators[category](seed=sample_seed)
-                
-                example = TrainingExample(
-                    id=str(uuid.uuid4()),
-                    instruction=data['instruction'],
-                    response=data['response'],
-                    pattern_type=data['pattern_type'],
-                    timeframe=data.get('timeframe'),
-                    seed=sample_seed,
-                    metadata=data.get('metadata', {})
-                )
-                samples.append(example.model_dump())
-                total_generated += 1
-                progress_bar.progress(total_generated / dataset_size)
-        
-        # Shuffle and save
-        random.shuffle(samples)
+        # Generate and save
+        status_text.text("Generating samples...")
         output_path = Path("datasets") / output_name
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with jsonlines.open(output_path, mode='w') as writer:
-            writer.write_all(samples)
+        written = generate_to_file(
+            distribution, actual_seed, str(output_path),
+            shards=int(shard_count), workers=int(worker_count),
+            progress=update_progress
+        )
+        record_dataset(str(output_path), written, distribution, {
+            'seed': actual_seed, 'shards': int(shard_count)
+        })
         
         status_text.text("")
         progress_bar.empty()
-        st.success(f"✓ Generated {len(samples)} samples → {output_path}")
+        st.success(f"✓ Generated {written} samples → {output_path}")
         st.balloons()
 
 with tab2:
@@ -132,21 +114,11 @@ with tab3:
     uploaded_file = st.file_uploader("Upload JSONL file", type=['jsonl'])
     
     if uploaded_file:
-        errors = []
-        valid_count = 0
-        
-        for i, line in enumerate(uploaded_file):
-            try:
-                import json
-                obj = json.loads(line)
-                TrainingExample(**obj)
-                valid_count += 1
-            except Exception as e:
-                errors.append(f"Line {i+1}: {str(e)}")
+        report = validate_lines(uploaded_file, max_errors=20)
         
-        if errors:
-            st.error(f"Found {len(errors)} errors")
-            for err in errors[:20]:
-                st.text(err)
+        if report['error_count']:
+            st.error(f"Found {report['error_count']} errors")
+            for line, err in report['errors']:
+                st.text(f"Line {line}: {err}")
         else:
-            st.success(f"✓ All {valid_count} samples are valid!")
+            st.success(f"✓ All {report['valid']} samples are valid!")
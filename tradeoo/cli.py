@@ -1,15 +1,23 @@
-"""Main CLI interface for dataset generation."""
+"""Main CLI interface for dataset generation.
+
+Only lightweight modules are imported here. Each command imports the
+engine, generators, NumPy or Pydantic itself when it needs them, so
+``--help`` and quick commands such as ``stats`` start fast.
+"""
 import click
-import jsonlines
-import uuid
+import json
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 import random
+import time
 
-from src.generators.pinescript import generate_pinescript
-from src.generators.price_action import generate_price_action
-from src.generators.institutional import generate_institutional
-from src.schemas import TrainingExample
+from src.catalog import record_dataset
+from src.checkpoint import load_state
+from src.exporters.arrow import DEFAULT_ROW_GROUP_ROWS, TABLE_FORMATS, TableWriter, table_format_for
+from src.serialization import (COMPRESSION_SUFFIXES, JsonlWriter, compression_for, iter_jsonl,
+                               strip_compression, with_compression)
+from src.stats import BUCKET_LABELS, compute_stats
 
 @click.group()
 def cli():
@@ -21,118 +29,385 @@ def cli():
 @click.option('--output', default='datasets/trading_dataset.jsonl', help='Output file path')
 @click.option('--seed', default=None, type=int, help='Random seed for reproducibility')
 @click.option('--balance', is_flag=True, help='Balance categories equally')
-def generate(size: int, output: str, seed: Optional[int], balance: bool):
+@click.option('--created-at', default=None, help='Fixed created_at timestamp for byte-identical rebuilds')
+@click.option('--shards', default=1, help='Split the seed space into this many part files')
+@click.option('--workers', default=1, help='Worker processes used to generate shards')
+@click.option('--merge/--no-merge', default=True, help='Concatenate part files into --output')
+@click.option('--validate-rate', default=None, type=click.FloatRange(0, 1),
+              help='Fraction of rows checked against the full schema (1.0 = every row, default 0.01)')
+@click.option('--dedup', is_flag=True, help='Drop exact and near-duplicate rows while generating')
+@click.option('--dedup-threshold', default=0.9, type=click.FloatRange(0, 1),
+              help='Estimated Jaccard similarity at which rows count as near-duplicates')
+@click.option('--unique', is_flag=True, help='Draw samples without replacement so no two rows repeat')
+@click.option('--checkpoint-every', default=0,
+              help='Rows between checkpoints kept in <output>.state.json for --resume/--append (0 = none)')
+@click.option('--resume', is_flag=True, help='Finish an interrupted run of --output from its last checkpoint')
+@click.option('--append', default=None, type=int, help='Add this many samples to a finished --output')
+@click.option('--compression', default=None, type=click.Choice(list(COMPRESSION_SUFFIXES)),
+              help='Compress the output (adds .gz/.zst to --output; implied by those suffixes)')
+@click.option('--format', 'table_format', default=None, type=click.Choice(list(TABLE_FORMATS)),
+              help='Write Parquet/Arrow directly instead of JSONL (implied by those suffixes)')
+def generate(size: int, output: str, seed: Optional[int], balance: bool, created_at: Optional[str],
+             shards: int, workers: int, merge: bool, validate_rate: Optional[float], dedup: bool,
+             dedup_threshold: float, unique: bool, checkpoint_every: int, resume: bool,
+             append: Optional[int], compression: Optional[str], table_format: Optional[str]):
     """Generate a new dataset."""
-    click.echo(f"Generating {size} samples...")
+    from src.engine import (DEFAULT_VALIDATE_RATE, SampleSpaceExhausted, append_to_file,
+                            category_distribution, check_unique, generate_to_file, parts_dir_for,
+                            resume_generation)
     
-    if seed is not None:
-        random.seed(seed)
-    
-    # Category distribution
-    if balance:
-        per_category = size // 3
-        distribution = {
-            'pinescript': per_category,
-            'price_action': per_category,
-            'institutional': size - 2 * per_category
-        }
+    if validate_rate is None:
+        validate_rate = DEFAULT_VALIDATE_RATE
+    compression = compression or compression_for(output)
+    if table_format:
+        output = str(Path(strip_compression(output)).with_suffix(TABLE_FORMATS[table_format]))
+    table_format = table_format_for(output)
+    if table_format:
+        if compression:
+            raise click.UsageError(f"--compression and .gz/.zst outputs apply to JSONL only; "
+                                   f"{table_format} files are written with their own codec")
+        if shards > 1:
+            raise click.BadParameter(f"{table_format} output is written by a single stream",
+                                     param_hint='--shards')
+        # Tables cannot be truncated and appended to, so there is nothing to resume
+        checkpoint_every = 0
     else:
-        distribution = {
-            'pinescript': int(size * 0.3),
-            'price_action': int(size * 0.4),
-            'institutional': int(size * 0.3)
-        }
-    
-    generators = {
-        'pinescript': generate_pinescript,
-        'price_action': generate_price_action,
-        'institutional': generate_institutional
-    }
-    
-    # Create output directory
-    Path(output).parent.mkdir(parents=True, exist_ok=True)
-    
-    samples = []
-    for category, count in distribution.items():
-        click.echo(f"  Generating {count} {category} samples...")
-        for i in range(count):
-            sample_seed = random.randint(0, 1000000) if seed is None else seed + i
-            data = generators[category](seed=sample_seed)
-            
-            example = TrainingExample(
-                id=str(uuid.uuid4()),
-                instruction=data['instruction'],
-                response=data['response'],
-                pattern_type=data['pattern_type'],
-                timeframe=data.get('timeframe'),
-                seed=sample_seed,
-                metadata=data.get('metadata', {})
-            )
-            samples.append(example.model_dump())
-    
-    # Shuffle
-    random.shuffle(samples)
-    
-    # Write JSONL
-    with jsonlines.open(output, mode='w') as writer:
-        writer.write_all(samples)
-    
-    click.echo(f"✓ Generated {len(samples)} samples → {output}")
-    click.echo(f"  PineScript: {distribution['pinescript']}")
-    click.echo(f"  Price Action: {distribution['price_action']}")
-    click.echo(f"  Institutional: {distribution['institutional']}")
+        output = with_compression(output, compression)
+    if resume or append is not None:
+        # Settings come from the checkpoint state, not from the other options
+        state = load_state(output)
+        if state is None:
+            raise click.BadParameter(f"No checkpoint state found for {output} "
+                                     "(generate it with --checkpoint-every to resume or append)",
+                                     param_hint='--output')
+        try:
+            if resume:
+                # Sharded runs commit whole shards; their rows count once merged
+                committed = state['rows'] + sum((state['completed_shards'] or {}).values())
+                click.echo(f"Resuming {output} from sample {committed}...")
+                written = resume_generation(output, workers=workers) - committed
+            else:
+                click.echo(f"Appending {append} samples to {output}...")
+                written = append_to_file(output, category_distribution(append, balance))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        
+        state = load_state(output)
+        if Path(output).exists():
+            distribution = state['distribution']
+            if state['dedup'] is not None:
+                distribution = _written_distribution(output, workers)
+            record_dataset(output, state['rows'], distribution, {
+                'seed': state['seed'], 'shards': state['shards'], 'created_at': state['created_at'],
+                'dedup': state['dedup'], 'unique': state['unique']
+            })
+        click.echo(f"✓ Wrote {written} samples; {output} now has {state['rows']}")
+        return
+    
+    click.echo(f"Generating {size} samples...")
+    
+    if seed is None:
+        seed = random.randint(0, 1000000)
+        click.echo(f"  Using random seed {seed}")
+    
+    distribution = category_distribution(size, balance)
+    if unique:
+        try:
+            check_unique(distribution)
+        except SampleSpaceExhausted as e:
+            raise click.BadParameter(str(e), param_hint='--size')
+    
+    # Rows are interleaved across categories and written as they are produced;
+    # output depends on seed and shard count only, never on worker count
+    written = generate_to_file(distribution, seed, output, created_at=created_at,
+                               shards=shards, workers=workers, merge=merge,
+                               validate_rate=validate_rate,
+                               dedup={'threshold': dedup_threshold} if dedup else None,
+                               unique=unique, checkpoint_every=checkpoint_every)
+    
+    requested = sum(distribution.values())
+    if shards > 1 and not merge:
+        output = str(parts_dir_for(output))
+    elif not table_format:
+        if dedup:
+            distribution = _written_distribution(output, workers)
+        record_dataset(output, written, distribution, {
+            'seed': seed, 'shards': shards, 'balance': balance, 'created_at': created_at,
+            'dedup_threshold': dedup_threshold if dedup else None, 'unique': unique
+        })
+    click.echo(f"✓ Generated {written} samples → {output}")
+    if dedup:
+        click.echo(f"  Duplicates dropped: {requested - written}")
+    click.echo(f"  PineScript: {distribution.get('pinescript', 0)}")
+    click.echo(f"  Price Action: {distribution.get('price_action', 0)}")
+    click.echo(f"  Institutional: {distribution.get('institutional', 0)}")
+
+def _written_distribution(output: str, workers: int) -> dict:
+    """Rows per category actually in ``output``; dedup drops rows after the category split."""
+    return dict(compute_stats(output, workers=max(1, workers))['patterns'])
 
 @cli.command()
 @click.option('--input', required=True, help='Input JSONL file to validate')
-def validate(input: str):
+@click.option('--workers', default=1, help='Worker processes validating byte-range chunks')
+def validate(input: str, workers: int):
     """Validate an existing dataset."""
+    from src.validation import validate_file
+    
     click.echo(f"Validating {input}...")
     
-    total = 0
-    errors = []
-    
-    with jsonlines.open(input) as reader:
-        for i, obj in enumerate(reader):
-            total += 1
-            try:
-                TrainingExample(**obj)
-            except Exception as e:
-                errors.append(f"Line {i+1}: {str(e)}")
-    
-    if errors:
-        click.echo(f"✗ Found {len(errors)} errors:")
-        for err in errors[:10]:
-            click.echo(f"  {err}")
+    report = validate_file(input, workers=workers, max_errors=10)
+    
+    if report['error_count']:
+        click.echo(f"✗ Found {report['error_count']} errors:")
+        for line, err in report['errors']:
+            click.echo(f"  Line {line}: {err}")
     else:
-        click.echo(f"✓ All {total} samples valid!")
+        click.echo(f"✓ All {report['total']} samples valid!")
 
 @cli.command()
 @click.option('--input', required=True, help='Input JSONL file')
-def stats(input: str):
-    """Show dataset statistics."""
-    from collections import Counter
+@click.option('--output', required=True, help='Output JSONL file for the kept rows')
+@click.option('--threshold', default=0.9, type=click.FloatRange(0, 1),
+              help='Estimated Jaccard similarity at which rows count as near-duplicates')
+@click.option('--num-perm', default=64, help='MinHash permutations per signature')
+@click.option('--shingle', default=3, help='Words per shingle')
+@click.option('--max-entries', default=500_000, help='Rows remembered at once (bounds memory)')
+@click.option('--exact-only', is_flag=True, help='Only drop byte-identical instruction/response pairs')
+def dedup(input: str, output: str, threshold: float, num_perm: int, shingle: int,
+          max_entries: int, exact_only: bool):
+    """Remove exact and near-duplicate samples from a dataset."""
+    from src.dedup import Deduplicator
+    
+    click.echo(f"Deduplicating {input}...")
     
-    pattern_counts = Counter()
-    timeframe_counts = Counter()
-    total = 0
+    deduplicator = Deduplicator(threshold=threshold, num_perm=num_perm, shingle=shingle,
+                                max_entries=max_entries, near=not exact_only)
+    distribution = Counter()
     
-    with jsonlines.open(input) as reader:
-        for obj in reader:
-            total += 1
-            pattern_counts[obj.get('pattern_type', 'unknown')] += 1
-            if obj.get('timeframe'):
-                timeframe_counts[obj['timeframe']] += 1
+    def kept():
+        for row in deduplicator.filter(iter_jsonl(input)):
+            distribution[row.get('pattern_type', 'unknown')] += 1
+            yield row
+    
+    started = time.perf_counter()
+    with JsonlWriter(output) as writer:
+        written = writer.write_all(kept())
+    elapsed = time.perf_counter() - started
+    
+    counts = deduplicator.stats
+    record_dataset(output, written, dict(distribution), {
+        'dedup_of': input, 'threshold': threshold, 'exact_only': exact_only
+    })
+    click.echo(f"✓ Kept {written} of {counts['seen']} samples → {output}")
+    click.echo(f"  Exact duplicates: {counts['exact']}")
+    click.echo(f"  Near duplicates: {counts['near']}")
+    click.echo(f"  Throughput: {counts['seen'] / max(elapsed, 1e-9):.0f} rows/s")
+
+@cli.command()
+@click.option('--input', required=True, help='Input JSONL file')
+@click.option('--output', required=True, help='Output JSONL file with readings added')
+@click.option('--chunk-rows', default=4096, help='Rows evaluated together per indicator call')
+def annotate(input: str, output: str, chunk_rows: int):
+    """Add indicator readings and signal times to PineScript samples."""
+    from src.readings import annotate_rows
+    
+    click.echo(f"Annotating {input}...")
+    
+    distribution = Counter()
+    annotated = 0
+    
+    def rows():
+        nonlocal annotated
+        for row in annotate_rows(iter_jsonl(input), chunk_rows):
+            distribution[row.get('pattern_type', 'unknown')] += 1
+            annotated += 'readings' in (row.get('metadata') or {})
+            yield row
+    
+    started = time.perf_counter()
+    with JsonlWriter(output) as writer:
+        written = writer.write_all(rows())
+    elapsed = time.perf_counter() - started
+    
+    record_dataset(output, written, dict(distribution), {'annotated_from': input})
+    click.echo(f"✓ Added readings to {annotated} of {written} samples → {output}")
+    click.echo(f"  Throughput: {written / max(elapsed, 1e-9):.0f} rows/s")
+
+@cli.command()
+@click.option('--input', required=True, help='Input JSONL file (.gz/.zst accepted)')
+@click.option('--output', default=None, help='Output file (default: --input with the format suffix)')
+@click.option('--format', 'table_format', default='parquet', type=click.Choice(list(TABLE_FORMATS)),
+              help='Output format')
+@click.option('--row-group-rows', default=DEFAULT_ROW_GROUP_ROWS,
+              help='Rows per Parquet row group / Arrow record batch')
+@click.option('--compression', default='default',
+              help='Codec (zstd, snappy, lz4, none); zstd for Parquet and none for Arrow by default')
+@click.option('--tokenized', is_flag=True,
+              help='Write packed token sequences (<output>.bin/.idx/.json) instead of a table')
+@click.option('--tokenizer', default=None, help='Local tokenizer.json used by --tokenized')
+@click.option('--seq-len', default=None, type=int, help='Tokens per packed sequence (default 512)')
+@click.option('--eos-token', default=None, help='EOS token (detected from the vocabulary by default)')
+def export(input: str, output: Optional[str], table_format: str, row_group_rows: int, compression: str,
+           tokenized: bool, tokenizer: Optional[str], seq_len: Optional[int], eos_token: Optional[str]):
+    """Export a dataset to Parquet/Arrow, or as pre-tokenized packed sequences."""
+    if tokenized:
+        from src.exporters.tokenized import DEFAULT_SEQ_LEN, write_packed
+        
+        if not tokenizer:
+            raise click.BadParameter("--tokenized needs a local tokenizer.json", param_hint='--tokenizer')
+        seq_len = seq_len or DEFAULT_SEQ_LEN
+        prefix = output or str(Path(strip_compression(input)).with_suffix(''))
+        click.echo(f"Tokenizing {input} → {prefix}.bin...")
+        started = time.perf_counter()
+        header = write_packed(iter_jsonl(input), prefix, tokenizer, seq_len=seq_len, eos_token=eos_token)
+        elapsed = time.perf_counter() - started
+        click.echo(f"✓ Packed {header['num_examples']} samples into {header['num_sequences']} "
+                   f"sequences of {seq_len} tokens ({header['dtype']})")
+        click.echo(f"  Tokens: {header['num_tokens']} ({header['num_tokens'] / max(elapsed, 1e-9):.0f}/s), "
+                   f"{header['dropped_tokens']} dropped from the last partial sequence "
+                   f"({header['dropped_examples']} samples not indexed)")
+        return
+    
+    output = output or str(Path(strip_compression(input)).with_suffix(TABLE_FORMATS[table_format]))
+    click.echo(f"Exporting {input} → {output}...")
+    
+    started = time.perf_counter()
+    with TableWriter(output, table_format, row_group_rows=row_group_rows,
+                     compression=None if compression == 'none' else compression) as writer:
+        written = writer.write_all(iter_jsonl(input))
+    elapsed = time.perf_counter() - started
+    
+    input_size, output_size = Path(input).stat().st_size, Path(output).stat().st_size
+    click.echo(f"✓ Exported {written} samples ({written / max(elapsed, 1e-9):.0f} rows/s)")
+    click.echo(f"  Size: {input_size / 1e6:.1f} MB → {output_size / 1e6:.1f} MB "
+               f"({output_size / max(input_size, 1):.0%} of input)")
+
+@cli.command()
+@click.option('--input', required=True, help='Input JSONL file')
+@click.option('--workers', default=1, help='Worker processes scanning byte-range chunks')
+def stats(input: str, workers: int):
+    """Show dataset statistics."""
+    report = compute_stats(input, workers=workers)
+    total = report['total']
     
     click.echo(f"Dataset Statistics for {input}")
     click.echo(f"  Total samples: {total}")
+    if report['unparseable']:
+        click.echo(f"  Unparseable lines: {report['unparseable']}")
+    if not total:
+        return
+    
     click.echo(f"\n  Pattern distribution:")
-    for pattern, count in pattern_counts.most_common():
+    for pattern, count in report['patterns'].most_common():
         click.echo(f"    {pattern}: {count} ({count/total*100:.1f}%)")
     
-    if timeframe_counts:
+    if report['timeframes']:
         click.echo(f"\n  Timeframe distribution:")
-        for tf, count in timeframe_counts.most_common():
+        for tf, count in report['timeframes'].most_common():
             click.echo(f"    {tf}: {count}")
+    
+    if report['templates']:
+        click.echo(f"\n  Template distribution:")
+        for template, count in report['templates'].most_common():
+            click.echo(f"    {template}: {count} ({count/total*100:.1f}%)")
+    
+    for field in ('instruction', 'response'):
+        click.echo(f"\n  {field.capitalize()} length (chars), mean {report[field + '_chars'] / total:.0f}:")
+        histogram = report[field + '_lengths']
+        for bucket in BUCKET_LABELS:
+            if histogram[bucket]:
+                click.echo(f"    {bucket:>9}: {histogram[bucket]}")
+    
+    tokens = report['estimated_tokens']
+    click.echo(f"\n  Estimated tokens: {tokens} (~{tokens / total:.0f} per sample)")
+
+@cli.command('verify-ohlc')
+@click.option('--input', default=None, help='OHLC Parquet file to check (default: check freshly generated bars)')
+@click.option('--pattern', default=None, help='Pattern label of --input, or the one pattern to generate')
+@click.option('--series', default=10000, help='Series generated per pattern')
+@click.option('--bars', default=10, type=click.IntRange(1), help='Bars per generated series')
+@click.option('--seed', default=42, help='Seed for generated bars')
+def verify_ohlc(input: Optional[str], pattern: Optional[str], series: int, bars: int, seed: int):
+    """Check that OHLC bars actually show their pattern label."""
+    from src.detectors import detect_all, verify_pattern
+    from src.generators.ohlc import PATTERNS, generate_ohlc_batch, read_ohlc_parquet
+    
+    if pattern is not None and pattern not in PATTERNS:
+        raise click.BadParameter(f"Unknown pattern {pattern!r} (choose from {', '.join(PATTERNS)})",
+                                 param_hint='--pattern')
+    if input is not None:
+        if pattern is None:
+            raise click.BadParameter("--input needs the --pattern it was generated as", param_hint='--pattern')
+        batches = {pattern: read_ohlc_parquet(input)}
+    else:
+        # Raw generator output, before the rejection stage redraws mislabeled series
+        try:
+            batches = {name: generate_ohlc_batch(name, series, bars, seed=seed, verify=False)
+                       for name in ([pattern] if pattern else PATTERNS)}
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--bars')
+    
+    total_bars = 0
+    started = time.perf_counter()
+    reports = {}
+    for name, batch in batches.items():
+        reports[name] = (verify_pattern(batch, name), detect_all(batch))
+        total_bars += batch['close'].size
+    elapsed = time.perf_counter() - started
+    
+    mismatched = 0
+    for name, (passed, detections) in reports.items():
+        failed = int((~passed).sum())
+        mismatched += failed
+        found = ', '.join(f"{detector} {int((hits != 0).sum())}" for detector, hits in detections.items())
+        click.echo(f"  {name:>10}: {passed.size - failed}/{passed.size} match ({failed / max(passed.size, 1):.2%} "
+                   f"label noise) | detected: {found}")
+    click.echo(f"  Throughput: {total_bars / max(elapsed, 1e-9) / 1e6:.1f}M bars/s")
+    
+    if input is not None and mismatched:
+        raise click.ClickException(f"{mismatched} series in {input} do not show a {pattern}")
+    click.echo("✓ Verification complete" if input is None else f"✓ Every series in {input} shows a {pattern}")
+
+@cli.command()
+@click.option('--sizes', default='1000,10000,100000',
+              help='Comma-separated dataset sizes for the end-to-end runs')
+@click.option('--number', default=5000, help='Calls timed per micro-benchmark')
+@click.option('--output', default=None, help='Write the JSON results to this file (default: stdout)')
+@click.option('--baseline', default=None, help='Earlier JSON results to compare against')
+@click.option('--tolerance', default=0.10, type=click.FloatRange(0),
+              help='Allowed slowdown vs --baseline before a metric counts as a regression')
+def bench(sizes: str, number: int, output: Optional[str], baseline: Optional[str], tolerance: float):
+    """Benchmark every generator and pipeline stage."""
+    from src.bench import compare, heavy_imports, run_suite
+    
+    report = run_suite([int(size) for size in sizes.split(',') if size], number=number)
+    text = json.dumps(report, indent=2)
+    
+    if output is None:
+        click.echo(text)
+    else:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text + '\n', encoding='utf-8')
+        results = report['results']
+        for name, timing in results['generators'].items():
+            click.echo(f"  {name:>22}: {timing['call_us']:8.1f}us  ({timing['per_s']:.0f}/s)")
+        for size, timing in results['end_to_end'].items():
+            click.echo(f"  {'generate ' + size:>22}: {timing['rows_per_s']:8.0f} rows/s  "
+                       f"({timing['seconds']:.2f}s)")
+        click.echo(f"✓ Results written to {output}")
+    
+    heavy = heavy_imports(report)
+    if heavy:
+        raise click.ClickException(f"import cli loaded {', '.join(heavy)}; "
+                                   "import them inside the commands that use them")
+    
+    if baseline:
+        with open(baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, tolerance)
+        for metric, before, after in regressions:
+            click.echo(f"  ✗ {metric}: {before:.2f} → {after:.2f} (+{after / before - 1:.0%})", err=True)
+        if regressions:
+            raise click.ClickException(f"{len(regressions)} metrics regressed more than {tolerance:.0%}")
+        click.echo(f"✓ No regressions vs {baseline}", err=True)
 
 if __name__ == '__main__':
     cli()
@@ -171,14 +171,7 @@ async function generateDataset() {
     progressFill.style.width = '0%';
     progressText.textContent = 'Generating dataset...';
 
-    // Simulate progress (since we don't have real-time updates)
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += 5;
-        if (progress <= 90) {
-            progressFill.style.width = progress + '%';
-        }
-    }, 200);
+    let job = null;
 
     try {
         const response = await fetch(`${API_BASE_URL}/generate`, {
@@ -189,11 +182,27 @@ async function generateDataset() {
             body: JSON.stringify(config)
         });
 
-        const data = await response.json();
+        const queued = await response.json();
+
+        if (!queued.success) {
+            throw new Error(queued.error || 'Generation failed');
+        }
+
+        // Poll the background job until it finishes
+        job = queued.job;
+        while (job.status === 'queued' || job.status === 'running') {
+            progressFill.style.width = Math.round(job.progress * 100) + '%';
+            progressText.textContent = job.rows_per_sec
+                ? `Generating... ${job.done}/${job.total} rows (${Math.round(job.rows_per_sec)} rows/s, ETA ${Math.ceil(job.eta_seconds || 0)}s)`
+                : 'Generating dataset...';
+            await new Promise(resolve => setTimeout(resolve, 500));
+            const poll = await fetch(`${API_BASE_URL}/jobs/${queued.job_id}`);
+            job = await poll.json();
+        }
 
-        clearInterval(progressInterval);
+        if (job.status === 'completed') {
+            const data = job.result;
 
-        if (data.success) {
             // Complete progress
             progressFill.style.width = '100%';
             progressText.textContent = 'Complete!';
@@ -225,11 +234,13 @@ async function generateDataset() {
                 showToast('Dataset generated successfully!', 'success');
                 loadDatasets(); // Refresh datasets list
             }, 500);
+        } else if (job.status === 'cancelled') {
+            progressCard.style.display = 'none';
+            showToast('Generation cancelled', 'info');
         } else {
-            throw new Error(data.error || 'Generation failed');
+            throw new Error(job.error || 'Generation failed');
         }
     } catch (error) {
-        clearInterval(progressInterval);
         progressCard.style.display = 'none';
         showToast('Error generating dataset: ' + error.message, 'error');
     } finally {
@@ -241,19 +252,39 @@ async function generateDataset() {
 // PREVIEW SAMPLES
 // ============================================
 
-async function previewSample(category) {
-    const previewId = `preview${category.charAt(0).toUpperCase() + category.slice(1).replace('_', '')}`;
-    const previewElement = document.getElementById(previewId);
+// Samples fetched per preview request; later clicks are served from the buffer
+const PREVIEW_BATCH_SIZE = 20;
+const previewBuffers = {};
 
-    previewElement.innerHTML = '<div style="text-align: center; padding: 2rem; color: #718096;">Loading...</div>';
+const PREVIEW_ELEMENT_IDS = {
+    pinescript: 'previewPinescript',
+    price_action: 'previewPriceAction',
+    institutional: 'previewInstitutional',
+    ohlc: 'previewOHLC'
+};
 
-    try {
-        const response = await fetch(`${API_BASE_URL}/preview/${category}`);
+async function nextPreview(key, url, field) {
+    if (!previewBuffers[key] || previewBuffers[key].length === 0) {
+        const response = await fetch(url);
         const data = await response.json();
 
         if (data.error) {
             throw new Error(data.error);
         }
+        previewBuffers[key] = data[field].map(item => ({ item, pattern: data.pattern }));
+    }
+    return previewBuffers[key].shift();
+}
+
+async function previewSample(category) {
+    const previewElement = document.getElementById(PREVIEW_ELEMENT_IDS[category]);
+
+    previewElement.innerHTML = '<div style="text-align: center; padding: 2rem; color: #718096;">Loading...</div>';
+
+    try {
+        const { item: data } = await nextPreview(
+            category, `${API_BASE_URL}/preview/${category}?n=${PREVIEW_BATCH_SIZE}`, 'samples'
+        );
 
         let html = `
             <div class="preview-label">Instruction</div>
@@ -277,23 +308,20 @@ ${data.metadata ? '\n' + JSON.stringify(data.metadata, null, 2) : ''}
 }
 
 async function previewOHLC() {
-    const previewElement = document.getElementById('previewOHLC');
+    const previewElement = document.getElementById(PREVIEW_ELEMENT_IDS.ohlc);
 
     previewElement.innerHTML = '<div style="text-align: center; padding: 2rem; color: #718096;">Loading...</div>';
 
     try {
-        const response = await fetch(`${API_BASE_URL}/preview/ohlc?pattern=breakout&num_bars=10`);
-        const data = await response.json();
-
-        if (data.error) {
-            throw new Error(data.error);
-        }
+        const { pattern, item: bars } = await nextPreview(
+            'ohlc', `${API_BASE_URL}/preview/ohlc?pattern=breakout&num_bars=10&n=${PREVIEW_BATCH_SIZE}`, 'series'
+        );
 
         let html = `
-            <div class="preview-label">Pattern: ${data.pattern}</div>
+            <div class="preview-label">Pattern: ${pattern}</div>
             <div class="preview-code">`;
 
-        data.bars.forEach((bar, i) => {
+        bars.forEach((bar, i) => {
             html += `Bar ${i + 1}: O=${bar.open.toFixed(2)} H=${bar.high.toFixed(2)} L=${bar.low.toFixed(2)} C=${bar.close.toFixed(2)} V=${bar.volume}\n`;
         });
 
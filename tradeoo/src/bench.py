@@ -0,0 +1,297 @@
+"""Micro-benchmarks for the generation pipeline.
+
+:func:`run_suite` times every stage (generators, OHLC snippets, example
+construction, JSON serialization, end-to-end ``generate_to_file``, CLI
+start-up and indicators) and returns a JSON-serializable report;
+:func:`compare` checks a report against an earlier one and
+:func:`heavy_imports` lists heavy modules that crept into ``import cli``.
+Timings are best-of-``repeat`` to damp scheduler noise, and every metric
+ending in ``_us`` is a cost (lower is better).
+"""
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.engine import GENERATORS, category_distribution, generate_to_file, iter_samples
+from src.generators import institutional, pinescript, price_action
+from src.generators.ohlc import PATTERNS, generate_ohlc_batch, generate_ohlc_snippet
+from src.generators.templates import LazyParams
+from src.indicators import bollinger, crosses, ema, rsi, vwap
+from src.readings import BAR_BANK_BARS, add_readings
+from src.schemas import TrainingExample, trusted_example
+from src.serialization import BACKENDS, get_backend
+
+TEMPLATE_MODULES = {
+    'pinescript': pinescript,
+    'price_action': price_action,
+    'institutional': institutional,
+}
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# CLI invocations timed from process start to exit
+CLI_COMMANDS = (('--help',), ('stats', '--help'), ('validate', '--help'), ('generate', '--help'))
+
+# Modules ``import cli`` should not pull in (commands import them on use)
+HEAVY_MODULES = ('numpy', 'pydantic', 'src.engine', 'src.generators.pinescript', 'src.dedup')
+
+# Fixed so end-to-end output (and its size) is identical between runs
+BENCH_SEED = 42
+BENCH_CREATED_AT = '2024-01-01T00:00:00'
+
+
+def _per_call_us(fn, number: int, repeat: int = 3) -> float:
+    """Best-of-``repeat`` cost of one ``fn()`` call in microseconds."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_templates(number: int = 20000) -> Dict[str, Dict[str, float]]:
+    """Per-sample cost in microseconds of legacy vs compiled template rendering.
+
+    ``legacy`` draws every parameter and renders with ``str.format(**params)``
+    (how the generators worked before compilation); ``compiled`` draws only
+    the referenced fields and renders by join.
+    """
+    results = {}
+    for category, module in TEMPLATE_MODULES.items():
+        rng = random.Random(0)
+
+        def legacy():
+            index = rng.randrange(len(module.TEMPLATES))
+            entry, compiled = module.TEMPLATES[index], module.COMPILED[index]
+            params = LazyParams(module.PARAMS, rng, compiled)
+            for key in module.PARAMS:
+                params[key]
+            return [entry[key].format(**params) for key in compiled.parts]
+
+        def compiled():
+            template = rng.choice(module.COMPILED)
+            params = template.draw(module.PARAMS, rng)
+            return [template.render(key, params) for key in template.parts]
+
+        results[category] = {
+            'legacy_us': timeit.timeit(legacy, number=number) / number * 1e6,
+            'compiled_us': timeit.timeit(compiled, number=number) / number * 1e6,
+        }
+    return results
+
+
+def bench_generators(number: int = 5000, num_bars: int = 10) -> Dict[str, Dict[str, float]]:
+    """Per-call latency of each sample generator and of OHLC snippets per pattern.
+
+    Generators are driven the way the engine drives them: one private RNG
+    reseeded per sample.
+    """
+    results = {}
+    for category, generate in GENERATORS.items():
+        sample_rng = random.Random()
+        seeds = iter(range(10 ** 12))
+
+        def call():
+            sample_rng.seed(next(seeds))
+            return generate(rng=sample_rng)
+
+        cost = _per_call_us(call, number)
+        results[category] = {'call_us': cost, 'per_s': 1e6 / cost}
+
+    for pattern in PATTERNS:
+        rng = np.random.default_rng(0)
+        cost = _per_call_us(lambda: generate_ohlc_snippet(pattern, num_bars=num_bars, rng=rng), number)
+        results[f'ohlc_{pattern}'] = {'call_us': cost, 'per_s': 1e6 / cost}
+    return results
+
+
+def bench_construction(number: int = 5000, rows: int = 2000) -> Dict[str, float]:
+    """Cost of building one row: validated ``TrainingExample`` vs :func:`trusted_example`.
+
+    ``row_bytes`` is the traced memory held per materialized row.
+    """
+    data = GENERATORS['price_action'](seed=1)
+    values = {
+        'id': '00000000-0000-4000-8000-000000000000',
+        'instruction': data['instruction'],
+        'response': data['response'],
+        'pattern_type': data['pattern_type'],
+        'timeframe': data.get('timeframe'),
+        'seed': 1,
+        'created_at': BENCH_CREATED_AT,
+        'metadata': data.get('metadata', {})
+    }
+    row = trusted_example(**values)
+    results = {
+        'model_dump_us': _per_call_us(lambda: TrainingExample(**values).model_dump(), number),
+        'model_validate_us': _per_call_us(lambda: TrainingExample.model_validate(row), number),
+        'trusted_us': _per_call_us(lambda: trusted_example(**values), number),
+    }
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = list(iter_samples(category_distribution(rows), BENCH_SEED, created_at=BENCH_CREATED_AT))
+        results['row_bytes'] = (tracemalloc.get_traced_memory()[0] - before) / len(held)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def bench_serialization(rows: int = 2000, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Per-row encode/decode cost for every importable JSON backend."""
+    sample = list(iter_samples(category_distribution(rows), BENCH_SEED, created_at=BENCH_CREATED_AT))
+    results = {}
+    for name, factory in BACKENDS.items():
+        try:
+            backend = factory()
+        except ImportError:
+            continue
+        lines = [backend.dumps_line(row) for row in sample]
+        results[name] = {
+            'dumps_us': _per_call_us(lambda: [backend.dumps_line(row) for row in sample], 1, repeat) / rows,
+            'loads_us': _per_call_us(lambda: [backend.loads(line) for line in lines], 1, repeat) / rows,
+            'line_bytes': sum(map(len, lines)) / rows,
+        }
+    return results
+
+
+def bench_end_to_end(sizes: Iterable[int] = DEFAULT_SIZES,
+                     directory: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Wall time of ``generate_to_file`` (single stream, defaults) per dataset size."""
+    results = {}
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for size in sizes:
+            output = Path(tmp) / f'bench-{size}.jsonl'
+            distribution = category_distribution(size)
+            started = timeit.default_timer()
+            written = generate_to_file(distribution, BENCH_SEED, str(output), created_at=BENCH_CREATED_AT)
+            elapsed = timeit.default_timer() - started
+            results[str(size)] = {
+                'seconds': elapsed,
+                'row_us': elapsed / written * 1e6,
+                'rows_per_s': written / elapsed,
+                'file_bytes_per_row': output.stat().st_size / written,
+            }
+            output.unlink()
+    return results
+
+
+def bench_indicators(series: int = 1024, bars: int = BAR_BANK_BARS, rows: int = 5000,
+                     repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Cost of each indicator over one ``(series, bars)`` random-walk batch, and of annotating rows."""
+    batch = generate_ohlc_batch('random_walk', series, bars, seed=BENCH_SEED, start=0)
+    close = batch['close']
+    fast = ema(close, 20)
+    cases = {
+        'ema': lambda: ema(close, 20),
+        'rsi': lambda: rsi(close, 14),
+        'bollinger': lambda: bollinger(close, 20, 2.0),
+        'vwap': lambda: vwap(close, batch['volume'], batch['timestamp']),
+        'crosses': lambda: crosses(close, fast),
+    }
+    results = {}
+    for name, fn in cases.items():
+        cost = _per_call_us(fn, 1, repeat)
+        results[name] = {'batch_us': cost, 'bars_per_s': close.size / cost * 1e6}
+
+    sample = list(iter_samples({'pinescript': rows}, BENCH_SEED, created_at=BENCH_CREATED_AT))
+    add_readings(sample)  # build the bar bank outside the timing
+    results['readings'] = {'row_us': _per_call_us(lambda: add_readings(sample), 1, repeat) / rows}
+    return results
+
+
+def import_times(statement: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from ``python -X importtime``."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(repeat: int = 5) -> Dict[str, Dict]:
+    """Wall time of short CLI invocations and what ``import cli`` loads."""
+    results = {}
+    for args in CLI_COMMANDS:
+        timings = []
+        for _ in range(repeat):
+            started = timeit.default_timer()
+            subprocess.run([sys.executable, 'cli.py', *args], cwd=ROOT, check=True,
+                           stdout=subprocess.DEVNULL)
+            timings.append(timeit.default_timer() - started)
+        results[' '.join(('cli',) + args)] = {'wall_us': min(timings) * 1e6}
+
+    times = min((import_times('import cli') for _ in range(repeat)), key=lambda t: t['cli'])
+    results['import cli'] = {
+        'import_us': times['cli'],
+        'heavy_modules': [module for module in HEAVY_MODULES if module in times],
+    }
+    return results
+
+
+def run_suite(sizes: Iterable[int] = DEFAULT_SIZES, number: int = 5000) -> Dict:
+    """Run every benchmark and return the results with environment metadata."""
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'json_backend': get_backend().name,
+        },
+        'results': {
+            'templates': bench_templates(number),
+            'generators': bench_generators(number),
+            'construction': bench_construction(number),
+            'serialization': bench_serialization(),
+            'end_to_end': bench_end_to_end(sizes),
+            'startup': bench_startup(),
+            'indicators': bench_indicators(),
+        },
+    }
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    """Flatten nested results to ``{"generators.pinescript.call_us": ...}``."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        else:
+            flat[name] = value
+    return flat
+
+
+def heavy_imports(report: Dict) -> List[str]:
+    """Modules from :data:`HEAVY_MODULES` that ``import cli`` loaded in ``report``."""
+    return report['results'].get('startup', {}).get('import cli', {}).get('heavy_modules', [])
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = 0.10) -> List[Tuple[str, float, float]]:
+    """Return ``(metric, baseline, current)`` for every ``_us`` cost that grew by more than ``tolerance``."""
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    return [(metric, before[metric], after[metric])
+            for metric in sorted(before.keys() & after.keys())
+            if metric.endswith('_us') and after[metric] > before[metric] * (1 + tolerance)]
+
+
+if __name__ == '__main__':
+    for category, timing in bench_templates().items():
+        print(f"{category:>14}: legacy {timing['legacy_us']:.2f}us  "
+              f"compiled {timing['compiled_us']:.2f}us  "
+              f"({timing['legacy_us'] / timing['compiled_us']:.2f}x)")
@@ -0,0 +1,113 @@
+"""Persisted catalog of generated datasets.
+
+Each dataset directory keeps a ``.catalog.json`` sidecar keyed by file
+name. Entries are written when a dataset is generated and are trusted as
+long as the file's size and mtime still match; anything else is rescanned
+once and cached.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.stats import compute_stats
+
+CATALOG_NAME = '.catalog.json'
+DATASET_PATTERNS = ('*.jsonl', '*.jsonl.gz', '*.jsonl.zst')
+
+
+class DatasetCatalog:
+    """Sidecar manifest of the datasets in one directory."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.path = self.directory / CATALOG_NAME
+        self._lock = threading.Lock()
+
+    def record(self, dataset: str, samples: int, distribution: Dict[str, int],
+               provenance: Optional[Dict] = None) -> Dict:
+        """Store what the writer already knows about a freshly written file."""
+        entry = self._entry(Path(dataset), samples, distribution, provenance)
+        with self._lock:
+            entries = self._load()
+            entries[entry['name']] = entry
+            self._save(entries)
+        return entry
+
+    def list(self) -> List[Dict]:
+        """Return entries for every dataset file, rescanning only changed ones."""
+        with self._lock:
+            entries = self._load()
+            files = {}
+            for pattern in DATASET_PATTERNS:
+                files.update((path.name, path) for path in self.directory.glob(pattern))
+
+            changed = False
+            for name in list(entries):
+                if name not in files:
+                    del entries[name]
+                    changed = True
+            for name, path in files.items():
+                if not self._is_fresh(entries.get(name), path):
+                    report = compute_stats(str(path))
+                    previous = entries.get(name) or {}
+                    entries[name] = self._entry(path, report['total'], dict(report['patterns']),
+                                                previous.get('provenance'))
+                    changed = True
+            if changed:
+                self._save(entries)
+        return list(entries.values())
+
+    def _entry(self, path: Path, samples: int, distribution: Dict[str, int],
+               provenance: Optional[Dict]) -> Dict:
+        stat = path.stat()
+        return {
+            'name': path.name,
+            'size_bytes': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'samples': samples,
+            'distribution': distribution,
+            'provenance': provenance,
+            'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
+            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+
+    @staticmethod
+    def _is_fresh(entry: Optional[Dict], path: Path) -> bool:
+        if entry is None:
+            return False
+        stat = path.stat()
+        return entry['size_bytes'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict[str, Dict]) -> None:
+        # Write-then-rename so readers never see a half-written catalog
+        tmp = self.path.with_name(f"{CATALOG_NAME}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+_catalogs: Dict[Path, DatasetCatalog] = {}
+
+
+def catalog_for(directory: str) -> DatasetCatalog:
+    """Return the shared catalog instance for a dataset directory."""
+    directory = Path(directory).resolve()
+    if directory not in _catalogs:
+        _catalogs[directory] = DatasetCatalog(str(directory))
+    return _catalogs[directory]
+
+
+def record_dataset(dataset: str, samples: int, distribution: Dict[str, int],
+                   provenance: Optional[Dict] = None) -> Dict:
+    """Record a freshly written dataset in its directory's catalog."""
+    return catalog_for(str(Path(dataset).parent)).record(dataset, samples, distribution, provenance)
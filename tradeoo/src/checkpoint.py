@@ -0,0 +1,45 @@
+"""Checkpoint state files for resumable generation.
+
+A checkpointed run writing ``foo.jsonl`` keeps ``foo.jsonl.state.json``
+beside it. The state records the generation settings, how many rows and
+bytes of the output are committed, and where the sample stream stopped
+(see :class:`~src.engine.Cursor`), so a killed run can pick up at the
+last checkpoint and a finished dataset can be extended later. Every fresh
+run writing ``foo.jsonl`` removes a state file left by an earlier run.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+STATE_SUFFIX = '.state.json'
+
+
+def state_path(output: str) -> Path:
+    """Path of the state file kept for ``output``."""
+    output = Path(output)
+    return output.with_name(output.name + STATE_SUFFIX)
+
+
+def load_state(output: str) -> Optional[Dict]:
+    """Return the saved state for ``output``, or ``None`` if it has none."""
+    try:
+        with open(state_path(output), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def clear_state(output: str) -> None:
+    """Remove the state file for ``output``, if any."""
+    state_path(output).unlink(missing_ok=True)
+
+
+def save_state(output: str, state: Dict) -> None:
+    """Atomically replace the state file for ``output``."""
+    path = state_path(output)
+    # Write-then-rename so a crash never leaves a truncated state file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
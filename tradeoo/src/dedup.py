@@ -0,0 +1,115 @@
+"""Streaming exact and near-duplicate removal (hashing + MinHash LSH)."""
+import hashlib
+import re
+import zlib
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick the LSH ``(bands, rows)`` split of ``num_perm`` closest to ``threshold``.
+
+    Candidates satisfy ``bands * rows == num_perm``; a split's threshold is
+    ``(1 / bands) ** (1 / rows)``.
+    """
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+class Deduplicator:
+    """Detects exact and near-duplicate instruction/response pairs in a stream.
+
+    Exact duplicates are caught by a 64-bit BLAKE2 digest of the text. Near
+    duplicates are found with MinHash signatures over word shingles, banded
+    for LSH lookup and confirmed by estimated Jaccard similarity against
+    ``threshold``. Memory is bounded by ``max_entries``: once full, the
+    oldest rows are forgotten (a sliding window over the stream).
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, shingle: int = 3,
+                 max_entries: int = 500_000, near: bool = True, seed: int = 1):
+        self.threshold = threshold
+        self.shingle = shingle
+        self.near = near
+        self.max_entries = max_entries
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-add-shift hashing: ((a * x + b) mod 2**64) >> 32
+        self._a = (rng.integers(0, 2 ** 64 - 1, size=num_perm, dtype=np.uint64, endpoint=True)
+                   | np.uint64(1))[:, None]
+        self._b = rng.integers(0, 2 ** 64 - 1, size=num_perm, dtype=np.uint64, endpoint=True)[:, None]
+
+        # Digests for lookup plus their insertion order for FIFO eviction
+        self._exact: Set[bytes] = set()
+        self._order: Deque[bytes] = deque()
+        self._buckets: Dict[Tuple[int, bytes], int] = {}
+        self._signatures = np.zeros((max_entries, num_perm), dtype=np.uint32) if near else None
+        self._next_slot = 0
+        self.stats = {'seen': 0, 'kept': 0, 'exact': 0, 'near': 0}
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's word shingles."""
+        tokens = _TOKEN.findall(text.lower())
+        width = min(self.shingle, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + width]) for i in range(max(1, len(tokens) - width + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        permuted = (self._a * hashes[None, :] + self._b) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def check(self, instruction: str, response: str) -> Optional[str]:
+        """Return ``"exact"`` or ``"near"`` for duplicates, else index the row and return ``None``."""
+        self.stats['seen'] += 1
+        text = f"{instruction}\n{response}"
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+        if digest in self._exact:
+            self.stats['exact'] += 1
+            return 'exact'
+
+        keys = None
+        if self.near:
+            signature = self.signature(text)
+            keys = self._band_keys(signature)
+            for key in keys:
+                slot = self._buckets.get(key)
+                if slot is not None and np.mean(self._signatures[slot] == signature) >= self.threshold:
+                    self.stats['near'] += 1
+                    return 'near'
+
+        self._remember(digest, keys, signature if self.near else None)
+        self.stats['kept'] += 1
+        return None
+
+    def filter(self, rows: Iterable[dict]) -> Iterator[dict]:
+        """Yield only rows that are not duplicates of an earlier row."""
+        for row in rows:
+            if self.check(row['instruction'], row['response']) is None:
+                yield row
+
+    def _band_keys(self, signature: np.ndarray):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _remember(self, digest: bytes, keys, signature: Optional[np.ndarray]) -> None:
+        self._exact.add(digest)
+        self._order.append(digest)
+        if len(self._order) > self.max_entries:
+            self._exact.discard(self._order.popleft())
+        if signature is None:
+            return
+
+        slot = self._next_slot % self.max_entries
+        if self._next_slot >= self.max_entries:
+            # Evict the row previously stored in this slot from the LSH buckets
+            for key in self._band_keys(self._signatures[slot]):
+                if self._buckets.get(key) == slot:
+                    del self._buckets[key]
+        self._signatures[slot] = signature
+        for key in keys:
+            self._buckets[key] = slot
+        self._next_slot += 1
@@ -0,0 +1,175 @@
+"""Vectorized candlestick pattern detectors for batches of OHLC series.
+
+Every detector takes a batch as produced by
+:func:`~src.generators.ohlc.generate_ohlc_batch` (``(num_series,
+num_bars)`` arrays keyed by field) and returns an int8 array of the same
+shape: ``+1`` where a bullish instance ends on that bar, ``-1`` for a
+bearish one and ``0`` otherwise. Nothing loops over series or bars in
+Python, so whole batches are checked at millions of bars per second.
+"""
+from typing import Callable, Dict
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+Batch = Dict[str, np.ndarray]
+
+# Pin bar: the rejection wick is this many bodies long and the body sits in
+# the outer third of the bar's range
+PIN_WICK_RATIO = 2.0
+PIN_BODY_SHARE = 1 / 3
+
+BREAKOUT_LOOKBACK = 5
+BREAKOUT_VOLUME_RATIO = 1.5
+
+ORDER_BLOCK_SPAN = 3
+ORDER_BLOCK_IMPULSE = 0.01
+
+# Fewest bars a pattern label can be drawn with; a breakout needs at least
+# one consolidation bar before its three breakout bars
+MIN_BARS = {"engulfing": 2, "breakout": 4}
+
+# Share of bar-to-bar steps that must be HH/HL (or LH/LL) for a trend label
+TREND_MIN_SHARE = 0.5
+
+
+def _signed(bullish: np.ndarray, bearish: np.ndarray) -> np.ndarray:
+    return bullish.astype(np.int8) - bearish.astype(np.int8)
+
+
+def _with_previous(values: np.ndarray, fill: float) -> np.ndarray:
+    """``values`` shifted one bar right along the last axis, ``fill`` in the first column."""
+    previous = np.empty_like(values)
+    previous[:, 0] = fill
+    previous[:, 1:] = values[:, :-1]
+    return previous
+
+
+def pin_bars(batch: Batch, wick_ratio: float = PIN_WICK_RATIO,
+             body_share: float = PIN_BODY_SHARE) -> np.ndarray:
+    """Small body with a long rejection wick: lower wick for bullish, upper for bearish."""
+    open_, high, low, close = batch["open"], batch["high"], batch["low"], batch["close"]
+    body = np.abs(close - open_)
+    upper = high - np.maximum(open_, close)
+    lower = np.minimum(open_, close) - low
+    small = body <= body_share * (high - low)
+    bullish = small & (lower >= wick_ratio * body) & (lower >= wick_ratio * upper)
+    bearish = small & (upper >= wick_ratio * body) & (upper >= wick_ratio * lower)
+    return _signed(bullish & (lower > 0), bearish & (upper > 0))
+
+
+def engulfing(batch: Batch) -> np.ndarray:
+    """A candle whose body covers the previous, opposite-coloured candle's body."""
+    open_, close = batch["open"], batch["close"]
+    prev_open, prev_close = _with_previous(open_, np.nan), _with_previous(close, np.nan)
+    with np.errstate(invalid="ignore"):
+        bullish = (prev_close < prev_open) & (close > open_) & (open_ <= prev_close) & (close >= prev_open)
+        bearish = (prev_close > prev_open) & (close < open_) & (open_ >= prev_close) & (close <= prev_open)
+    return _signed(bullish, bearish)
+
+
+def breakouts(batch: Batch, lookback: int = BREAKOUT_LOOKBACK,
+              volume_ratio: float = BREAKOUT_VOLUME_RATIO) -> np.ndarray:
+    """Close beyond the prior ``lookback`` bars' range on expanded volume.
+
+    Bars with fewer than ``lookback`` predecessors are never flagged.
+    """
+    high, low, close = batch["high"], batch["low"], batch["close"]
+    out = np.zeros(close.shape, dtype=np.int8)
+    if lookback < 1 or close.shape[1] <= lookback:
+        return out
+    # Window j covers bars j .. j + lookback - 1 and is compared with bar j + lookback
+    prior_high = sliding_window_view(high, lookback, axis=1)[:, :-1].max(axis=2)
+    prior_low = sliding_window_view(low, lookback, axis=1)[:, :-1].min(axis=2)
+    prior_volume = sliding_window_view(batch["volume"], lookback, axis=1)[:, :-1].mean(axis=2)
+    current = close[:, lookback:]
+    surge = batch["volume"][:, lookback:] >= volume_ratio * prior_volume
+    out[:, lookback:] = _signed(surge & (current > prior_high), surge & (current < prior_low))
+    return out
+
+
+def swing_structure(batch: Batch) -> np.ndarray:
+    """Higher high and higher low (``+1``) or lower high and lower low (``-1``) vs the previous bar."""
+    high, low = batch["high"], batch["low"]
+    prev_high, prev_low = _with_previous(high, np.nan), _with_previous(low, np.nan)
+    with np.errstate(invalid="ignore"):
+        return _signed((high > prev_high) & (low > prev_low), (high < prev_high) & (low < prev_low))
+
+
+def order_blocks(batch: Batch, span: int = ORDER_BLOCK_SPAN,
+                 impulse: float = ORDER_BLOCK_IMPULSE) -> np.ndarray:
+    """The last opposite candle before an impulsive move.
+
+    Bullish: a bearish candle after which some close within the next
+    ``span`` bars is at least ``impulse`` above its high (bearish mirrors
+    this below its low). Flagged on the order-block candle itself.
+    """
+    open_, high, low, close = batch["open"], batch["high"], batch["low"], batch["close"]
+    rows = close.shape[0]
+    ahead_max = np.concatenate([close[:, 1:], np.full((rows, span), -np.inf)], axis=1)
+    ahead_min = np.concatenate([close[:, 1:], np.full((rows, span), np.inf)], axis=1)
+    future_max = sliding_window_view(ahead_max, span, axis=1)[:, :close.shape[1]].max(axis=2)
+    future_min = sliding_window_view(ahead_min, span, axis=1)[:, :close.shape[1]].min(axis=2)
+    bullish = (close < open_) & (future_max >= high * (1 + impulse))
+    bearish = (close > open_) & (future_min <= low * (1 - impulse))
+    return _signed(bullish, bearish)
+
+
+DETECTORS: Dict[str, Callable[[Batch], np.ndarray]] = {
+    "pin_bar": pin_bars,
+    "engulfing": engulfing,
+    "breakout": breakouts,
+    "structure": swing_structure,
+    "order_block": order_blocks,
+}
+
+
+def _trend_share(batch: Batch, direction: int) -> np.ndarray:
+    steps = swing_structure(batch)[:, 1:]
+    return (steps == direction).mean(axis=1) if steps.shape[1] else np.ones(steps.shape[0])
+
+
+def _uptrend(batch: Batch) -> np.ndarray:
+    rising = batch["close"][:, -1] > batch["open"][:, 0]
+    return rising & (_trend_share(batch, 1) >= TREND_MIN_SHARE)
+
+
+def _downtrend(batch: Batch) -> np.ndarray:
+    falling = batch["close"][:, -1] < batch["open"][:, 0]
+    return falling & (_trend_share(batch, -1) >= TREND_MIN_SHARE)
+
+
+def _breakout(batch: Batch) -> np.ndarray:
+    # Generated breakouts are the last three bars after a consolidation
+    num_bars = batch["close"].shape[1]
+    lookback = min(BREAKOUT_LOOKBACK, num_bars - 3)
+    if lookback < 1:
+        # No bar before the breakout to break out of
+        return np.zeros(batch["close"].shape[0], dtype=bool)
+    return (breakouts(batch, lookback=lookback)[:, -3:] == 1).any(axis=1)
+
+
+# Pattern label -> per-series check that the bars actually show it
+LABEL_CHECKS: Dict[str, Callable[[Batch], np.ndarray]] = {
+    "uptrend": _uptrend,
+    "downtrend": _downtrend,
+    "breakout": _breakout,
+    "pin_bar": lambda batch: pin_bars(batch)[:, -1] == 1,
+    "engulfing": lambda batch: engulfing(batch)[:, -1] == 1,
+}
+
+
+def verify_pattern(batch: Batch, pattern: str) -> np.ndarray:
+    """Boolean ``(num_series,)`` mask of series that match their ``pattern`` label.
+
+    Patterns without a check (e.g. random walks) always pass.
+    """
+    check = LABEL_CHECKS.get(pattern)
+    if check is None:
+        return np.ones(batch["close"].shape[0], dtype=bool)
+    return check(batch)
+
+
+def detect_all(batch: Batch) -> Dict[str, np.ndarray]:
+    """Run every detector over the batch."""
+    return {name: detector(batch) for name, detector in DETECTORS.items()}
@@ -0,0 +1,568 @@
+"""Streaming dataset generation engine."""
+import hashlib
+import os
+import random
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from src.checkpoint import clear_state, load_state, save_state
+from src.exporters.arrow import TableWriter, table_format_for
+from src.generators import CATEGORIES, GENERATORS, LazyRegistry, generator_module
+from src.generators.templates import space_size
+from src.schemas import TrainingExample, trusted_example
+from src.serialization import JsonlWriter, compression_for, iter_jsonl, strip_compression, with_compression
+
+if TYPE_CHECKING:
+    from src.dedup import Deduplicator
+
+
+def _space_size(category: str) -> int:
+    module = generator_module(category)
+    if hasattr(module, 'space_size'):
+        return module.space_size()
+    return space_size(module.COMPILED, module.SPACE)
+
+
+# Upper bound on distinct samples per category (see ``SPACE`` in each generator,
+# or its own ``space_size()`` when fields are not drawn independently)
+SPACE_SIZES: Mapping[str, int] = LazyRegistry({category: partial(_space_size, category)
+                                            for category in CATEGORIES})
+
+# Seeds tried for one row before a unique run gives up on a category
+MAX_UNIQUE_ATTEMPTS = 1000
+
+# Fraction of trusted rows re-checked against the full Pydantic model
+DEFAULT_VALIDATE_RATE = 0.01
+
+
+class GenerationCancelled(Exception):
+    """Raised from a ``progress`` callback to abort :func:`generate_to_file`."""
+
+
+class SampleSpaceExhausted(ValueError):
+    """Raised when a unique run asks for more samples than a category can produce."""
+
+
+def check_unique(distribution: Dict[str, int]) -> None:
+    """Raise :class:`SampleSpaceExhausted` if any count exceeds its space size."""
+    for category, count in distribution.items():
+        if count > SPACE_SIZES[category]:
+            raise SampleSpaceExhausted(
+                f"Requested {count} unique {category} samples, but its templates "
+                f"can produce at most {SPACE_SIZES[category]}"
+            )
+
+
+def category_distribution(size: int, balance: bool = False) -> Dict[str, int]:
+    """Split ``size`` samples across categories (30/40/30 unless balanced)."""
+    if balance:
+        per_category = size // 3
+        return {
+            'pinescript': per_category,
+            'price_action': per_category,
+            'institutional': size - 2 * per_category
+        }
+    return {
+        'pinescript': int(size * 0.3),
+        'price_action': int(size * 0.4),
+        'institutional': int(size * 0.3)
+    }
+
+
+def weighted_distribution(size: int, weights: Dict[str, float]) -> Dict[str, int]:
+    """Split ``size`` samples using percentage weights per category."""
+    return {category: int(size * weight / 100) for category, weight in weights.items()}
+
+
+def plan_shards(distribution: Dict[str, int], shards: int) -> List[Dict]:
+    """Split per-category counts into ``shards`` contiguous slices.
+
+    Each slice records its per-category counts and seed offsets, so shard
+    ``k`` covers exactly the sample seeds an unsharded run would use.
+    """
+    plan = []
+    for index in range(shards):
+        counts = {}
+        offsets = {}
+        for category, total in distribution.items():
+            start = total * index // shards
+            counts[category] = total * (index + 1) // shards - start
+            offsets[category] = start
+        plan.append({'index': index, 'counts': counts, 'offsets': offsets})
+    return plan
+
+
+class Cursor:
+    """Position in one sample stream: ordering RNG plus per-category counts.
+
+    :func:`iter_samples` advances a cursor in place, and checkpoints save it
+    with :meth:`to_dict` so the stream can continue exactly where it stopped.
+    """
+
+    def __init__(self, distribution: Dict[str, int], seed: int, shard: int = 0,
+                 offsets: Optional[Dict[str, int]] = None):
+        self.rng = random.Random(f"{seed}:{shard}")
+        self.shard = shard
+        self.produced = dict(offsets) if offsets else {category: 0 for category in distribution}
+        self.remaining = dict(distribution)
+        self.index = 0
+
+    def to_dict(self) -> Dict:
+        version, internal, gauss = self.rng.getstate()
+        return {
+            'shard': self.shard,
+            'rng': [version, list(internal), gauss],
+            'produced': dict(self.produced),
+            'remaining': dict(self.remaining),
+            'index': self.index
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Cursor":
+        cursor = cls(data['remaining'], 0, data['shard'], data['produced'])
+        version, internal, gauss = data['rng']
+        cursor.rng.setstate((version, tuple(internal), gauss))
+        cursor.index = data['index']
+        return cursor
+
+
+def interleave_categories(distribution: Dict[str, int], rng: random.Random) -> Iterator[str]:
+    """Yield category names in a well-mixed order using O(categories) memory.
+
+    Each step picks a category with probability proportional to its remaining
+    count, which gives the same ordering distribution as shuffling the full
+    list of labels without ever materializing it.
+    """
+    remaining = dict(distribution)
+    total = sum(remaining.values())
+    while total:
+        pick = rng.randrange(total)
+        for category, count in remaining.items():
+            if pick < count:
+                break
+            pick -= count
+        remaining[category] -= 1
+        total -= 1
+        yield category
+
+
+def iter_samples(distribution: Dict[str, int], seed: int,
+                 created_at: Optional[str] = None, shard: int = 0,
+                 offsets: Optional[Dict[str, int]] = None,
+                 validate_rate: float = DEFAULT_VALIDATE_RATE,
+                 unique: bool = False, shards: int = 1, cursor: Optional[Cursor] = None,
+                 seen: Optional[Dict[str, set]] = None) -> Iterator[dict]:
+    """Yield serialized training examples one at a time.
+
+    Sample seeds follow the historical ``seed + i`` scheme per category
+    (shifted by ``offsets`` for shards), and ordering and ids are drawn from
+    a private per-shard RNG, so the same seed always yields the same rows in
+    the same order without touching the global ``random`` state.
+
+    Rows are built with :func:`trusted_example`; every ``1 / validate_rate``-th
+    row is also validated against ``TrainingExample`` (``1.0`` checks all,
+    ``0`` none) and a schema violation raises ``ValidationError``.
+
+    With ``unique`` every row's instruction/response is distinct (see
+    :func:`_draw_unique`); pass the run's total ``shards`` so rows stay
+    distinct across shards too.
+
+    Passing a :class:`Cursor` continues the stream it describes (advancing
+    it as rows are yielded) instead of starting one from ``distribution``,
+    ``shard`` and ``offsets``; ``seen`` then holds the per-category digests
+    (:func:`sample_digest`) of rows a unique run has already written.
+    """
+    cursor = cursor or Cursor(distribution, seed, shard, offsets)
+    rng, produced, remaining = cursor.rng, cursor.produced, cursor.remaining
+    sample_rng = random.Random()
+    created_at = created_at or datetime.utcnow().isoformat()
+    stride = max(1, round(1 / validate_rate)) if validate_rate > 0 else 0
+    if unique:
+        check_unique({category: produced[category] + count for category, count in remaining.items()})
+        seen = seen if seen is not None else {}
+
+    for category in interleave_categories(remaining, rng):
+        remaining[category] -= 1
+        slot = produced[category]
+        produced[category] += 1
+        index = cursor.index
+        cursor.index += 1
+        if unique:
+            sample_seed, data = _draw_unique(category, seed, slot, seen.setdefault(category, set()),
+                                             sample_rng, cursor.shard, shards)
+        else:
+            sample_seed = seed + slot
+            # Reseeding one private instance keeps every row reproducible from its
+            # ``seed`` field without allocating a new RNG per row
+            sample_rng.seed(sample_seed)
+            data = GENERATORS[category](rng=sample_rng)
+
+        row = trusted_example(
+            id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            instruction=data['instruction'],
+            response=data['response'],
+            pattern_type=data['pattern_type'],
+            timeframe=data.get('timeframe'),
+            seed=sample_seed,
+            created_at=created_at,
+            metadata=data.get('metadata', {})
+        )
+        if stride and index % stride == 0:
+            TrainingExample.model_validate(row)
+        yield row
+
+
+def sample_digest(instruction: str, response: str) -> bytes:
+    """64-bit digest identifying a sample by its text."""
+    return hashlib.blake2b(f"{instruction}\n{response}".encode('utf-8'), digest_size=8).digest()
+
+
+def _draw_unique(category: str, seed: int, slot: int, seen: set, sample_rng: random.Random,
+                 shard: int, shards: int) -> Tuple[int, Dict]:
+    """Draw the sample for one row of a unique run, skipping repeats.
+
+    The first candidate seed is the usual ``seed + slot``; retries use
+    seeds hashed from ``(seed, category, slot, attempt)``, so candidate
+    seeds never overlap between rows and every row is still reproducible
+    from its ``seed`` field. Samples are keyed by a 64-bit digest of their
+    text, and with several shards each digest belongs to exactly one
+    shard, so merged parts contain no repeats either.
+    """
+    for attempt in range(MAX_UNIQUE_ATTEMPTS):
+        if attempt == 0:
+            sample_seed = seed + slot
+        else:
+            key = f"{seed}:{category}:{slot}:{attempt}".encode('utf-8')
+            sample_seed = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big') >> 1
+        sample_rng.seed(sample_seed)
+        data = GENERATORS[category](rng=sample_rng)
+        digest = sample_digest(data['instruction'], data['response'])
+        if digest in seen or (shards > 1 and int.from_bytes(digest, 'big') % shards != shard):
+            continue
+        seen.add(digest)
+        return sample_seed, data
+    raise SampleSpaceExhausted(
+        f"Could not find a new {category} sample after {MAX_UNIQUE_ATTEMPTS} attempts "
+        f"({len(seen)} distinct so far); request fewer rows"
+    )
+
+
+def write_jsonl(rows: Iterable[dict], output: str) -> int:
+    """Write rows to ``output`` as they arrive and return the row count."""
+    with JsonlWriter(output) as writer:
+        return writer.write_all(rows)
+
+
+def _write_shard(spec: Dict, seed: int, created_at: str, path: str, validate_rate: float,
+                 dedup: Optional[Dict] = None, unique: bool = False,
+                 shards: int = 1) -> Tuple[int, int]:
+    """Process-pool entry point: generate one shard into its part file.
+
+    Returns ``(generated, written)``; they differ only when ``dedup`` drops rows.
+    """
+    rows = iter_samples(spec['counts'], seed, created_at, shard=spec['index'],
+                        offsets=spec['offsets'], validate_rate=validate_rate,
+                        unique=unique, shards=shards)
+    if dedup is not None:
+        rows = new_deduplicator(dedup).filter(rows)
+    return sum(spec['counts'].values()), write_jsonl(rows, path)
+
+
+def new_deduplicator(options: Optional[Dict]) -> Optional["Deduplicator"]:
+    """Build a :class:`~src.dedup.Deduplicator` from ``options``, or ``None`` when dedup is off.
+
+    Imported here so runs without dedup never load NumPy.
+    """
+    if options is None:
+        return None
+    from src.dedup import Deduplicator
+    return Deduplicator(**options)
+
+
+def _open_writer(path: str, append: bool = False):
+    """JSONL writer, or a :class:`TableWriter` for ``.parquet``/``.arrow`` paths."""
+    if table_format_for(path):
+        return TableWriter(path)
+    return JsonlWriter(path, append=append)
+
+
+def parts_dir_for(output: str) -> Path:
+    """Directory holding the part files of a sharded run writing ``output``."""
+    output_path = Path(strip_compression(output))
+    return output_path.parent / f"{output_path.stem}-parts"
+
+
+def merge_parts(parts: List[Path], output: str) -> None:
+    """Concatenate part files, in shard order, into ``output``.
+
+    Compressed parts are gzip members or zstd frames, so they concatenate too.
+    """
+    with open(output, 'wb') as dest:
+        for part in parts:
+            with open(part, 'rb') as src:
+                shutil.copyfileobj(src, dest, 1024 * 1024)
+
+
+def generate_to_file(distribution: Dict[str, int], seed: int, output: str,
+                     created_at: Optional[str] = None, shards: int = 1, workers: int = 1,
+                     merge: bool = True, progress: Optional[Callable[[int], None]] = None,
+                     validate_rate: float = DEFAULT_VALIDATE_RATE,
+                     dedup: Optional[Dict] = None, unique: bool = False,
+                     checkpoint_every: int = 0) -> int:
+    """Generate a dataset into ``output`` and return the number of rows written.
+
+    With ``shards > 1`` the seed space is split by :func:`plan_shards` and
+    each shard is written to ``<stem>-parts/part-00000.jsonl`` etc. by a
+    process pool of ``workers``. A ``.gz`` or ``.zst`` ``output`` is written
+    compressed, parts included. A ``.parquet`` or ``.arrow`` ``output`` is
+    written directly as a table (single stream, no checkpoints). Output
+    depends only on the seed and shard count, never on the worker count.
+    ``merge`` concatenates the parts into ``output`` and removes them.
+    ``progress`` receives row counts as they complete. ``validate_rate`` is
+    passed through to :func:`iter_samples`.
+
+    ``dedup`` enables inline duplicate removal: it holds keyword arguments
+    for :class:`~src.dedup.Deduplicator` (``{}`` for the defaults). Sharded
+    runs deduplicate within each shard. Dropped rows still count towards
+    ``progress`` but not towards the returned total.
+
+    ``unique`` makes every row distinct by construction, raising
+    :class:`SampleSpaceExhausted` up front when a category count exceeds
+    :data:`SPACE_SIZES`, or later if its templates run out of new samples.
+
+    ``checkpoint_every > 0`` keeps a state file beside ``output`` (see
+    :mod:`src.checkpoint`), committed every that many rows and after each
+    shard, so :func:`resume_generation` can finish an interrupted run and
+    :func:`append_to_file` can extend a finished one. Any existing state
+    file for ``output`` is removed first.
+
+    If ``progress`` raises :class:`GenerationCancelled`, pending shards are
+    dropped, running ones are waited for, partial output is removed (unless
+    checkpointing, where it is kept for resuming) and the exception
+    propagates.
+    """
+    if unique:
+        check_unique(distribution)
+    if table_format_for(output) and (shards > 1 or checkpoint_every):
+        raise ValueError(f"{output} is written as a single stream; use one shard and no checkpoints")
+    output_path = Path(output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # A state file left by an earlier run describes bytes this run overwrites
+    clear_state(output)
+    state = {
+        'seed': seed,
+        'created_at': created_at or datetime.utcnow().isoformat(),
+        'validate_rate': validate_rate,
+        'dedup': dedup,
+        'unique': unique,
+        'shards': shards,
+        'merge': merge,
+        'checkpoint_every': checkpoint_every,
+        'distribution': dict(distribution),
+        'next_shard': max(1, shards),
+        'rows': 0,
+        'bytes': 0,
+        'cursor': None,
+        'completed_shards': None,
+        'complete': False
+    }
+
+    if shards <= 1:
+        return _write_stream(output_path, state, Cursor(distribution, seed), progress)
+    return _write_sharded(output_path, state, workers, progress)
+
+
+def resume_generation(output: str, workers: int = 1,
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+    """Finish an interrupted checkpointed run; return the dataset's total rows.
+
+    Rows after the last checkpoint are discarded and regenerated, so the
+    result is the same as an uninterrupted run. (The one exception is a run
+    with both ``unique`` and ``dedup``: samples dedup dropped are not
+    recorded, so the remainder stays duplicate-free but may differ.)
+    Finished runs are left as is. Raises :class:`ValueError` if ``output``
+    is shorter than its last checkpoint, or was changed after finishing.
+    """
+    state = _require_state(output)
+    if not state['complete']:
+        output_path = Path(output)
+        if state['cursor'] is None:
+            _write_sharded(output_path, state, workers, progress)
+        else:
+            # Drop anything written after the last checkpoint; it is regenerated
+            if state['bytes']:
+                os.truncate(output_path, state['bytes'])
+            seen, deduplicator = _replay(output_path, state)
+            _write_stream(output_path, state, Cursor.from_dict(state['cursor']), progress,
+                          seen, deduplicator)
+    return state['rows']
+
+
+def append_to_file(output: str, distribution: Dict[str, int],
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+    """Extend a finished checkpointed dataset and return the rows appended.
+
+    The new rows come from a fresh ordering stream (the next unused shard
+    index) and continue every category's seeds after those already used,
+    so existing rows are never regenerated and appends are deterministic.
+    Settings (seed, ``created_at``, dedup, unique) are those of the
+    original run; unique and dedup runs also skip repeats of existing rows.
+    """
+    state = _require_state(output)
+    if not state['complete']:
+        raise ValueError(f"{output} is unfinished; resume it before appending")
+    if state['shards'] > 1 and not state['merge']:
+        raise ValueError(f"{output} was written as unmerged parts and cannot be appended to")
+
+    totals = dict(state['distribution'])
+    for category, count in distribution.items():
+        totals[category] = totals.get(category, 0) + count
+    if state['unique']:
+        check_unique(totals)
+
+    output_path = Path(output)
+    seen, deduplicator = _replay(output_path, state)
+    cursor = Cursor(distribution, state['seed'], shard=state['next_shard'],
+                    offsets=state['distribution'])
+    state.update(distribution=totals, next_shard=state['next_shard'] + 1,
+                 cursor=cursor.to_dict(), complete=False)
+    save_state(output, state)
+    return _write_stream(output_path, state, cursor, progress, seen, deduplicator)
+
+
+def _require_state(output: str) -> Dict:
+    """Load the state for ``output`` and check the file still matches it.
+
+    Unfinished runs may have rows past the last checkpoint; unfinished
+    sharded runs have not written ``output`` at all yet.
+    """
+    state = load_state(output)
+    if state is None:
+        raise FileNotFoundError(f"No checkpoint state found for {output}")
+    if state['complete'] or state['cursor'] is not None:
+        size = os.path.getsize(output) if os.path.exists(output) else 0
+        if size < state['bytes'] or (state['complete'] and size != state['bytes']):
+            raise ValueError(f"{output} is {size} bytes but its checkpoint state records "
+                             f"{state['bytes']}; it was changed after that run")
+    return state
+
+
+def _replay(output_path: Path, state: Dict):
+    """Rebuild unique digests and dedup memory from the rows already in ``output``."""
+    seen = {} if state['unique'] else None
+    deduplicator = new_deduplicator(state['dedup'])
+    if (seen is None and deduplicator is None) or not state['bytes']:
+        return seen, deduplicator
+    for row in iter_jsonl(str(output_path)):
+        if seen is not None:
+            seen.setdefault(row['pattern_type'], set()).add(
+                sample_digest(row['instruction'], row['response']))
+        if deduplicator is not None:
+            deduplicator.check(row['instruction'], row['response'])
+    return seen, deduplicator
+
+
+def _write_stream(output_path: Path, state: Dict, cursor: Cursor,
+                  progress: Optional[Callable[[int], None]],
+                  seen: Optional[Dict[str, set]] = None,
+                  deduplicator: Optional["Deduplicator"] = None) -> int:
+    """Write rows from ``cursor``, appending to the output if it has committed bytes.
+
+    Returns the rows written by this call and updates ``state`` to match.
+    """
+    checkpoint_every = state['checkpoint_every']
+    rows = iter_samples(cursor.remaining, state['seed'], state['created_at'],
+                        validate_rate=state['validate_rate'], unique=state['unique'],
+                        cursor=cursor, seen=seen)
+    if deduplicator is None:
+        deduplicator = new_deduplicator(state['dedup'])
+    if deduplicator is not None:
+        rows = deduplicator.filter(rows)
+
+    def commit(writer):
+        writer.sync()
+        state['rows'] = committed_rows + written
+        state['bytes'] = writer.tell()
+        state['cursor'] = cursor.to_dict()
+        save_state(str(output_path), state)
+
+    appending = state['bytes'] > 0
+    committed_rows = state['rows']
+    start = cursor.index
+    written = reported = 0
+    try:
+        with _open_writer(str(output_path), append=appending) as writer:
+            for row in rows:
+                writer.write(row)
+                written += 1
+                if checkpoint_every and written % checkpoint_every == 0:
+                    commit(writer)
+                if progress and cursor.index - start - reported >= 1000:
+                    progress(cursor.index - start - reported)
+                    reported = cursor.index - start
+    except GenerationCancelled:
+        if not checkpoint_every:
+            output_path.unlink(missing_ok=True)
+        raise
+
+    state.update(rows=committed_rows + written, bytes=output_path.stat().st_size,
+                 cursor=None, complete=True)
+    if checkpoint_every:
+        save_state(str(output_path), state)
+    if progress and cursor.index - start > reported:
+        progress(cursor.index - start - reported)
+    return written
+
+
+def _write_sharded(output_path: Path, state: Dict, workers: int,
+                   progress: Optional[Callable[[int], None]]) -> int:
+    """Generate (or finish) a sharded run; shards already completed are kept."""
+    checkpoint_every = state['checkpoint_every']
+    shards = state['shards']
+    parts_dir = parts_dir_for(str(output_path))
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    plan = plan_shards(state['distribution'], shards)
+    compression = compression_for(str(output_path))
+    parts = [Path(with_compression(parts_dir / f"part-{spec['index']:05d}.jsonl", compression))
+             for spec in plan]
+    completed = state['completed_shards'] or {}
+    state['completed_shards'] = completed
+    if checkpoint_every:
+        save_state(str(output_path), state)
+
+    written = sum(completed.values())
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(_write_shard, spec, state['seed'], state['created_at'], str(part),
+                        state['validate_rate'], state['dedup'], state['unique'], shards): spec['index']
+            for spec, part in zip(plan, parts) if str(spec['index']) not in completed
+        }
+        try:
+            for future in as_completed(futures):
+                generated, rows = future.result()
+                written += rows
+                if checkpoint_every:
+                    completed[str(futures[future])] = rows
+                    save_state(str(output_path), state)
+                if progress:
+                    progress(generated)
+        except GenerationCancelled:
+            # Wait for running shards so none writes into parts_dir after it is removed
+            pool.shutdown(cancel_futures=True)
+            if not checkpoint_every:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+            raise
+
+    if state['merge']:
+        merge_parts(parts, str(output_path))
+        shutil.rmtree(parts_dir)
+        state['bytes'] = output_path.stat().st_size
+    state.update(rows=written, completed_shards=None, complete=True)
+    if checkpoint_every:
+        save_state(str(output_path), state)
+    return written
@@ -0,0 +1 @@
+"""Dataset exporters for formats other than JSONL."""
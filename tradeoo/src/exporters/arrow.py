@@ -0,0 +1,165 @@
+"""Parquet and Arrow IPC export of ``TrainingExample`` rows.
+
+Low-cardinality columns (``pattern_type``, ``timeframe``, ``source``,
+``metadata.template`` ...) are dictionary-encoded against one dictionary per
+column that only ever grows, so Arrow files carry small delta dictionaries
+and Parquet stores dictionary pages. ``metadata`` is kept as a JSON string
+because its ``params`` differ from template to template.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.serialization import dumps
+
+# File suffix for each table format
+TABLE_FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Rows per Parquet row group / Arrow record batch
+DEFAULT_ROW_GROUP_ROWS = 65536
+
+# Columns stored as dictionary<int32, string>
+DICTIONARY_COLUMNS = ('pattern_type', 'timeframe', 'ticker', 'source', 'created_at', 'language', 'template')
+
+# Default codec per format; Arrow stays uncompressed so readers can memory-map it zero-copy
+DEFAULT_COMPRESSION = {'parquet': 'zstd', 'arrow': None}
+
+
+def _pyarrow():
+    """Import pyarrow on demand; it is only needed for Parquet/Arrow export."""
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Parquet/Arrow export requires pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def table_format_for(path: str) -> Optional[str]:
+    """Table format implied by a file name (``"parquet"``, ``"arrow"`` or ``None``)."""
+    for name, suffix in TABLE_FORMATS.items():
+        if str(path).endswith(suffix):
+            return name
+    return None
+
+
+def training_schema() -> "pyarrow.Schema":
+    """Arrow schema for exported ``TrainingExample`` rows."""
+    pa = _pyarrow()
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.string()),
+        ('instruction', pa.string()),
+        ('response', pa.string()),
+        ('pattern_type', categorical),
+        ('timeframe', categorical),
+        ('ticker', categorical),
+        ('source', categorical),
+        ('created_at', categorical),
+        ('seed', pa.int64()),
+        ('confidence', pa.float64()),
+        ('language', categorical),
+        ('template', categorical),
+        ('metadata', pa.string()),
+    ])
+
+
+class _Dictionary:
+    """Append-only value -> index mapping for one dictionary column."""
+
+    def __init__(self):
+        # Arrow IPC files cannot grow an empty dictionary by deltas (pyarrow
+        # sees a replacement), so every dictionary starts with ""
+        self.index: Dict[Optional[str], int] = {'': 0}
+        self.values: List[str] = ['']
+
+    def encode(self, column: List[Optional[str]]) -> "pyarrow.DictionaryArray":
+        pa = _pyarrow()
+        index, values = self.index, self.values
+        codes = []
+        for value in column:
+            code = index.get(value)
+            if code is None:
+                code = -1 if value is None else len(values)
+                index[value] = code
+                if value is not None:
+                    values.append(value)
+            codes.append(code)
+        indices = pa.array(codes, type=pa.int32(), mask=[code < 0 for code in codes])
+        return pa.DictionaryArray.from_arrays(indices, pa.array(values, type=pa.string()))
+
+
+class TableWriter:
+    """Write rows to a Parquet or Arrow IPC file; use as a context manager.
+
+    ``table_format`` defaults to the one implied by the file name.
+    ``row_group_rows`` sets the Parquet row group (and Arrow record batch)
+    size and ``compression`` the codec (``None`` for none).
+    """
+
+    def __init__(self, path: str, table_format: Optional[str] = None,
+                 row_group_rows: int = DEFAULT_ROW_GROUP_ROWS, compression: Any = 'default'):
+        pa = _pyarrow()
+        self.table_format = table_format or table_format_for(path) or 'parquet'
+        if compression == 'default':
+            compression = DEFAULT_COMPRESSION[self.table_format]
+        self.schema = training_schema()
+        self.row_group_rows = row_group_rows
+        self._dictionaries = {name: _Dictionary() for name in DICTIONARY_COLUMNS}
+        self._columns: Dict[str, List] = {name: [] for name in self.schema.names}
+        self._pending = 0
+
+        if self.table_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression or 'none')
+        elif self.table_format == 'arrow':
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True, compression=compression)
+            self._writer = pa.ipc.new_file(path, self.schema, options=options)
+        else:
+            raise ValueError(f"Unknown table format: {self.table_format}")
+
+    def write(self, row: Dict) -> None:
+        columns = self._columns
+        metadata = row.get('metadata') or {}
+        for name in ('id', 'instruction', 'response', 'pattern_type', 'timeframe', 'ticker',
+                     'source', 'created_at', 'seed', 'confidence', 'language'):
+            columns[name].append(row.get(name))
+        columns['template'].append(metadata.get('template'))
+        columns['metadata'].append(dumps(metadata).decode('utf-8'))
+        self._pending += 1
+        if self._pending >= self.row_group_rows:
+            self._flush()
+
+    def write_all(self, rows: Iterable[Dict]) -> int:
+        """Write every row and return how many were written."""
+        written = 0
+        for row in rows:
+            self.write(row)
+            written += 1
+        return written
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        pa = _pyarrow()
+        arrays = []
+        for field in self.schema:
+            values = self._columns[field.name]
+            if field.name in self._dictionaries:
+                arrays.append(self._dictionaries[field.name].encode(values))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        batch = pa.record_batch(arrays, schema=self.schema)
+        if self.table_format == 'parquet':
+            self._writer.write_batch(batch, row_group_size=self.row_group_rows)
+        else:
+            self._writer.write_batch(batch)
+        self._columns = {name: [] for name in self.schema.names}
+        self._pending = 0
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,148 @@
+"""Pre-tokenized, packed training shards.
+
+Each row is formatted with the prompt used in ``docs/FINETUNING.md``,
+tokenized with a local ``tokenizer.json`` (HuggingFace ``tokenizers``, no
+network access needed), terminated with EOS and packed into one token
+stream cut into fixed-length sequences. For an output prefix ``name``:
+
+- ``name.bin``: packed tokens (``uint16`` if the vocabulary fits, else
+  ``uint32``); memory-map it as ``(num_sequences, seq_len)``.
+- ``name.idx``: ``int64`` ``(start, length)`` pairs locating every packed
+  example (EOS included) in the token stream.
+- ``name.json``: header with dtype, ``seq_len``, counts and tokenizer info.
+"""
+import json
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+PROMPT_TEMPLATE = "### Instruction:\n{instruction}\n\n### Response:\n{response}"
+
+DEFAULT_SEQ_LEN = 512
+
+# Rows handed to the tokenizer at once; encode_batch tokenizes them in parallel
+ENCODE_BATCH = 1024
+
+# Tried in order when no EOS token is given
+EOS_CANDIDATES = ('</s>', '<|endoftext|>', '<|end_of_text|>', '<eos>', '[SEP]')
+
+
+def load_tokenizer(path: str):
+    """Load a ``tokenizer.json`` from disk with HuggingFace ``tokenizers``."""
+    try:
+        from tokenizers import Tokenizer
+    except ImportError as exc:
+        raise ImportError("Tokenized export requires tokenizers: pip install tokenizers") from exc
+    return Tokenizer.from_file(str(path))
+
+
+def format_example(row: Dict) -> str:
+    """Render a row in the instruction/response prompt format."""
+    return PROMPT_TEMPLATE.format(instruction=row['instruction'], response=row['response'])
+
+
+def eos_id(tokenizer, eos_token: Optional[str] = None) -> int:
+    """Id of ``eos_token``, or of the first known EOS token in the vocabulary."""
+    for token in ([eos_token] if eos_token else EOS_CANDIDATES):
+        token_id = tokenizer.token_to_id(token)
+        if token_id is not None:
+            return token_id
+    raise ValueError(f"Tokenizer has no EOS token {eos_token or EOS_CANDIDATES}; pass one explicitly")
+
+
+def _batches(rows: Iterable[Dict], size: int) -> Iterator[List[str]]:
+    batch = []
+    for row in rows:
+        batch.append(format_example(row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_packed(rows: Iterable[Dict], prefix: str, tokenizer_path: str,
+                 seq_len: int = DEFAULT_SEQ_LEN, eos_token: Optional[str] = None,
+                 pad_last: bool = False) -> Dict:
+    """Tokenize and pack ``rows`` into ``prefix.bin/.idx/.json``; return the header.
+
+    Tokens left over after the last full sequence are dropped unless
+    ``pad_last`` pads them to ``seq_len`` with EOS; examples that do not
+    fit entirely in the kept tokens are left out of ``.idx``.
+    """
+    tokenizer = load_tokenizer(tokenizer_path)
+    eos = eos_id(tokenizer, eos_token)
+    vocab_size = tokenizer.get_vocab_size()
+    dtype = np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+    Path(prefix).parent.mkdir(parents=True, exist_ok=True)
+    remainder = np.empty(0, dtype=dtype)
+    examples = tokens = 0
+    with open(Path(f"{prefix}.bin"), 'wb') as bin_file, open(Path(f"{prefix}.idx"), 'wb') as idx_file:
+        for texts in _batches(rows, ENCODE_BATCH):
+            ids = [encoding.ids + [eos] for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)]
+            lengths = np.fromiter((len(doc) for doc in ids), dtype=np.int64, count=len(ids))
+            starts = tokens + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            np.column_stack((starts, lengths)).tofile(idx_file)
+            examples += len(ids)
+            tokens += int(lengths.sum())
+
+            stream = np.concatenate((remainder, np.fromiter(chain.from_iterable(ids), dtype=dtype,
+                                                            count=int(lengths.sum()))))
+            full = len(stream) - len(stream) % seq_len
+            stream[:full].tofile(bin_file)
+            remainder = stream[full:]
+
+        dropped = len(remainder)
+        if pad_last and dropped:
+            np.concatenate((remainder, np.full(seq_len - dropped, eos, dtype=dtype))).tofile(bin_file)
+            dropped = 0
+        if dropped:
+            # Examples cut by the dropped tail would point past the end of .bin
+            idx_file.flush()
+            ends = np.fromfile(Path(f"{prefix}.idx"), dtype=np.int64).reshape(-1, 2).sum(axis=1)
+            kept = int(np.searchsorted(ends, tokens - dropped, side='right'))
+            idx_file.truncate(kept * 2 * np.dtype(np.int64).itemsize)
+            dropped_examples, examples = examples - kept, kept
+        else:
+            dropped_examples = 0
+
+    header = {
+        'format': 'packed',
+        'dtype': np.dtype(dtype).name,
+        'seq_len': seq_len,
+        'num_sequences': (tokens - dropped + seq_len - 1) // seq_len,
+        'num_examples': examples,
+        'num_tokens': tokens,
+        'dropped_tokens': dropped,
+        'dropped_examples': dropped_examples,
+        'eos_id': eos,
+        'vocab_size': vocab_size,
+        'tokenizer': str(tokenizer_path),
+        'prompt_template': PROMPT_TEMPLATE,
+    }
+    with open(Path(f"{prefix}.json"), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+    return header
+
+
+def load_packed(prefix: str) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """Memory-map packed shards as ``(sequences, index, header)``.
+
+    ``sequences`` is ``(num_sequences, seq_len)`` and ``index`` is
+    ``(num_examples, 2)`` ``(start, length)`` offsets into ``sequences.ravel()``.
+    """
+    with open(Path(f"{prefix}.json"), 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    sequences = _map(Path(f"{prefix}.bin"), header['dtype'], (header['num_sequences'], header['seq_len']))
+    index = _map(Path(f"{prefix}.idx"), np.int64, (header['num_examples'], 2))
+    return sequences, index, header
+
+
+def _map(path: Path, dtype, shape: Tuple[int, int]) -> np.ndarray:
+    # Empty exports leave empty files, which cannot be memory-mapped
+    if not shape[0]:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
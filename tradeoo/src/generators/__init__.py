@@ -1 +1,45 @@
-"""Init file for generators."""
+"""Init file for generators.
+
+Generator modules compile their templates at import, so they are loaded on
+first use: :data:`GENERATORS` maps each category to its
+``generate_<category>`` function without importing anything up front.
+"""
+import importlib
+from collections.abc import Mapping
+from functools import partial
+from typing import Any, Callable, Dict, Iterator
+
+CATEGORIES = ('pinescript', 'price_action', 'institutional')
+
+
+def generator_module(category: str):
+    """Import and return ``src.generators.<category>``."""
+    if category not in CATEGORIES:
+        raise KeyError(category)
+    return importlib.import_module(f'src.generators.{category}')
+
+
+class LazyRegistry(Mapping):
+    """Read-only mapping whose values are built by a loader on first lookup."""
+
+    def __init__(self, loaders: Dict[str, Callable[[], Any]]):
+        self._loaders = loaders
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            self._values[key] = self._loaders[key]()
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+
+def _load_generator(category: str) -> Callable:
+    return getattr(generator_module(category), f'generate_{category}')
+
+
+GENERATORS = LazyRegistry({category: partial(_load_generator, category) for category in CATEGORIES})
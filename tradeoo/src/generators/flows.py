@@ -0,0 +1,145 @@
+"""Vectorized FII/DII daily flow simulation backing the institutional generator."""
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+REGIMES = ("risk_off", "neutral", "risk_on")
+
+# Mean daily net flow (₹Cr) per regime; DIIs lean against foreign flows
+FII_REGIME_MEAN = np.array([-1500.0, 0.0, 1500.0])
+DII_REGIME_MEAN = np.array([1000.0, 300.0, -200.0])
+
+# Additive FII bias (₹Cr) by calendar month, January first
+MONTHLY_SEASONALITY = np.array([-300.0, -150.0, 350.0, 200.0, 100.0, -100.0,
+                                150.0, -200.0, -250.0, -350.0, 250.0, 300.0])
+
+REGIME_PERSISTENCE = 0.97   # chance a regime carries over to the next day (~33-day regimes)
+FII_AUTOCORRELATION = 0.35  # AR(1) weight of yesterday's FII surprise
+FII_VOLATILITY = 1200.0
+DII_ABSORPTION = 0.6        # share of an FII surprise DIIs take the other side of
+DII_VOLATILITY = 700.0
+FII_LIMIT = 8000
+DII_LIMIT = 6000
+
+# The shared bank institutional samples are drawn from
+FLOW_BANK_SEED = 20240101
+FLOW_BANK_HISTORIES = 2048
+FLOW_BANK_DAYS = 252
+FLOW_BANK_START = "2024-01-01"
+
+
+def trading_days(num_days: int, start: str = FLOW_BANK_START) -> np.ndarray:
+    """``num_days`` consecutive weekdays from ``start`` as ``datetime64[D]``."""
+    return np.busday_offset(np.datetime64(start, "D"), np.arange(num_days), roll="forward")
+
+
+def simulate_flows(num_histories: int, num_days: int = FLOW_BANK_DAYS,
+                   rng: np.random.Generator = None, seed: int = None,
+                   start: str = FLOW_BANK_START) -> Dict[str, np.ndarray]:
+    """Simulate ``num_histories`` independent markets of daily FII/DII net flows.
+
+    Each history follows a persistent risk-off/neutral/risk-on regime
+    (Markov chain, :data:`REGIME_PERSISTENCE`). FII nets are the regime
+    mean plus a monthly seasonal bias plus an AR(1) surprise, so buying and
+    selling come in streaks; DII nets take the other side of part of each
+    FII surprise. Returns ``date`` ``(num_days,)`` and ``(num_histories,
+    num_days)`` arrays ``regime`` (int8), ``fii_net``/``dii_net`` (int32,
+    ₹Cr) and ``fii_streak``/``dii_streak`` (see :func:`flow_streaks`).
+
+    The loop runs once per day, vectorized across histories.
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    dates = trading_days(num_days, start)
+    months = dates.astype("datetime64[M]").astype(np.int64) % 12
+    shape = (num_histories, num_days)
+
+    stay = rng.random(shape) < REGIME_PERSISTENCE
+    shifts = rng.integers(1, len(REGIMES), size=shape)
+    fii_noise = rng.normal(0.0, FII_VOLATILITY, size=shape)
+    dii_noise = rng.normal(0.0, DII_VOLATILITY, size=shape)
+
+    regime = np.empty(shape, dtype=np.int8)
+    surprise = np.empty(shape)
+    current = rng.integers(0, len(REGIMES), size=num_histories)
+    previous = np.zeros(num_histories)
+    for day in range(num_days):
+        current = np.where(stay[:, day], current, (current + shifts[:, day]) % len(REGIMES))
+        previous = FII_AUTOCORRELATION * previous + fii_noise[:, day]
+        regime[:, day] = current
+        surprise[:, day] = previous
+
+    fii = FII_REGIME_MEAN[regime] + MONTHLY_SEASONALITY[months] + surprise
+    dii = DII_REGIME_MEAN[regime] - DII_ABSORPTION * surprise + dii_noise
+    fii_net = np.clip(np.rint(fii), -FII_LIMIT, FII_LIMIT).astype(np.int32)
+    dii_net = np.clip(np.rint(dii), -DII_LIMIT, DII_LIMIT).astype(np.int32)
+    return {
+        "date": dates,
+        "regime": regime,
+        "fii_net": fii_net,
+        "dii_net": dii_net,
+        "fii_streak": flow_streaks(fii_net),
+        "dii_streak": flow_streaks(dii_net),
+    }
+
+
+def flow_streaks(net: np.ndarray) -> np.ndarray:
+    """Signed length of the same-direction run ending on each day.
+
+    ``+3`` is the third straight day of net buying, ``-1`` the first day of
+    net selling and ``0`` a flat day. Computed along the last axis without
+    a Python loop.
+    """
+    sign = np.sign(net).astype(np.int8)
+    days = np.arange(sign.shape[-1])
+    starts = np.ones(sign.shape, dtype=bool)
+    starts[..., 1:] = sign[..., 1:] != sign[..., :-1]
+    run_start = np.maximum.accumulate(np.where(starts, days, 0), axis=-1)
+    return ((days - run_start + 1) * sign).astype(np.int32)
+
+
+class FlowBank:
+    """Simulated flow days indexed by FII/DII direction for O(1) sampling."""
+
+    def __init__(self, flows: Dict[str, np.ndarray]):
+        self.flows = flows
+        self.num_days = flows["fii_net"].shape[1]
+        self._dates = [str(date) for date in flows["date"]]
+        fii = np.sign(flows["fii_net"]).ravel()
+        dii = np.sign(flows["dii_net"]).ravel()
+        self._index = {(f, d): np.flatnonzero((fii == f) & (dii == d))
+                       for f in (-1, 1) for d in (-1, 1)}
+        self._combined: Dict[Tuple, np.ndarray] = {}
+
+    def days(self, directions: Iterable[Tuple[int, int]]) -> np.ndarray:
+        """Flat ``history * num_days + day`` indices whose (FII, DII) signs are in ``directions``."""
+        directions = tuple(directions)
+        if directions not in self._combined:
+            self._combined[directions] = np.concatenate([self._index[d] for d in directions])
+        return self._combined[directions]
+
+    def pick(self, directions: Iterable[Tuple[int, int]], rng: random.Random) -> Dict:
+        """Draw one day with a matching flow direction using ``rng``."""
+        candidates = self.days(directions)
+        flat = candidates.item(rng.randrange(len(candidates)))
+        history, day = divmod(flat, self.num_days)
+        flows = self.flows
+        return {
+            "history": history,
+            "day": day,
+            "date": self._dates[day],
+            "regime": REGIMES[flows["regime"].item(flat)],
+            "fii_net": flows["fii_net"].item(flat),
+            "dii_net": flows["dii_net"].item(flat),
+            "fii_streak": flows["fii_streak"].item(flat),
+            "dii_streak": flows["dii_streak"].item(flat),
+        }
+
+
+@lru_cache(maxsize=1)
+def flow_bank(seed: Optional[int] = FLOW_BANK_SEED) -> FlowBank:
+    """The process-wide bank of simulated histories, built on first use."""
+    return FlowBank(simulate_flows(FLOW_BANK_HISTORIES, FLOW_BANK_DAYS, seed=seed))
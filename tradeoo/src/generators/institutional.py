@@ -1,97 +1,147 @@
-"""Institutional flow (FII/DII) generator."""
+"""Institutional flow (FII/DII) generator.
+
+Amounts, dates and streaks come from a day of a simulated flow history
+(:mod:`src.generators.flows`) whose FII/DII directions match the template,
+so net flow, streak length and sentiment always agree with each other.
+"""
 import random
 from typing import Dict
 
+from src.generators.flows import flow_bank
+from src.generators.templates import compile_templates
+
 TEMPLATES = [
     {
         "name": "FII_Buying",
         "instruction": "Analyze FII flow: bought ₹{fii_buy}Cr, DII sold ₹{dii_sell}Cr on {date}",
-        "response": "FII net buying of ₹{fii_buy}Cr vs DII selling of ₹{dii_sell}Cr indicates foreign institutional interest. Net flow: +₹{net_flow}Cr. Sentiment: {sentiment}. Typically supports {market_action}. Sectors: {sectors}. Watch for continuation if FII buying sustains 3+ days. Reversal risk if DIIs turn buyers or FII flow reverses."
+        "response": "FII net buying of ₹{fii_buy}Cr vs DII selling of ₹{dii_sell}Cr indicates foreign institutional interest. Net flow: {net_flow}. Sentiment: {sentiment}. Typically supports {market_action}. Sectors: {sectors}. {fii_streak_note} Reversal risk if DIIs turn buyers or FII flow reverses."
     },
     {
         "name": "DII_Support",
         "instruction": "Interpret DII buying ₹{dii_buy}Cr, FII selling ₹{fii_sell}Cr",
-        "response": "DII buying ₹{dii_buy}Cr absorbing FII selling of ₹{fii_sell}Cr shows domestic institutional support. Net: {net_flow}Cr. This often stabilizes markets during FII outflows. Sentiment: {sentiment}. Suggests {market_action}. DIIs typically support large-caps and PSUs. Monitor if FII selling accelerates beyond DII capacity."
+        "response": "DII buying ₹{dii_buy}Cr absorbing FII selling of ₹{fii_sell}Cr shows domestic institutional support. Net: {net_flow}. This often stabilizes markets during FII outflows. {dii_streak_note} Sentiment: {sentiment}. Suggests {market_action}. DIIs typically support large-caps and PSUs. Monitor if FII selling accelerates beyond DII capacity."
     },
     {
         "name": "Dual_Selling",
         "instruction": "Assess both FII sold ₹{fii_sell}Cr and DII sold ₹{dii_sell}Cr",
-        "response": "Combined institutional selling: FII -₹{fii_sell}Cr, DII -₹{dii_sell}Cr. Total outflow: ₹{total_outflow}Cr. Sentiment: {sentiment}. Indicates {market_action}. Retail unlikely to absorb this pressure. Expect volatility and downside. Look for support at key levels. Reversal needs institutional flow to turn positive."
+        "response": "Combined institutional selling: FII -₹{fii_sell}Cr, DII -₹{dii_sell}Cr. Total outflow: ₹{total_outflow}Cr. Sentiment: {sentiment}. Indicates {market_action}. Retail unlikely to absorb this pressure. Expect volatility and downside. {fii_streak_note} Look for support at key levels. Reversal needs institutional flow to turn positive."
     },
     {
         "name": "Dual_Buying",
         "instruction": "Evaluate FII bought ₹{fii_buy}Cr, DII bought ₹{dii_buy}Cr",
-        "response": "Strong institutional buying: FII +₹{fii_buy}Cr, DII +₹{dii_buy}Cr. Total inflow: ₹{total_inflow}Cr. Sentiment: {sentiment}. Signals {market_action}. Broad-based rally likely across sectors. Momentum can sustain with continued flows. Entry: on pullbacks. Exit: if flows reverse or diverge."
+        "response": "Strong institutional buying: FII +₹{fii_buy}Cr, DII +₹{dii_buy}Cr. Total inflow: ₹{total_inflow}Cr. Sentiment: {sentiment}. Signals {market_action}. Broad-based rally likely across sectors. Momentum can sustain with continued flows. {fii_streak_note} Entry: on pullbacks. Exit: if flows reverse or diverge."
     },
     {
         "name": "Mixed_Flow",
         "instruction": "Analyze mixed flow: FII {fii_action} ₹{fii_amt}Cr, DII {dii_action} ₹{dii_amt}Cr on {sector} sector",
-        "response": "{sector} sector flows: FII {fii_action} ₹{fii_amt}Cr, DII {dii_action} ₹{dii_amt}Cr. Net: ₹{net_flow}Cr. Sentiment: {sentiment}. Divergence suggests {market_action}. FII prefer growth/momentum, DII prefer value/defensives. Sector rotation likely. Watch for convergence or acceleration in one direction."
+        "response": "{sector} sector flows: FII {fii_action} ₹{fii_amt}Cr, DII {dii_action} ₹{dii_amt}Cr. Net: {net_flow}. Sentiment: {sentiment}. Divergence suggests {market_action}. FII prefer growth/momentum, DII prefer value/defensives. Sector rotation likely. Watch for convergence or acceleration in one direction."
     }
 ]
 
-def generate_institutional(seed: int = None) -> Dict[str, str]:
-    """Generate institutional flow analysis."""
-    if seed is not None:
-        random.seed(seed)
-    
-    template = random.choice(TEMPLATES)
-    
-    fii_buy = round(random.uniform(500, 5000), 0)
-    fii_sell = round(random.uniform(500, 5000), 0)
-    dii_buy = round(random.uniform(300, 4000), 0)
-    dii_sell = round(random.uniform(300, 4000), 0)
-    
-    fii_action = random.choice(["bought", "sold"])
-    dii_action = random.choice(["bought", "sold"])
-    fii_amt = fii_buy if fii_action == "bought" else fii_sell
-    dii_amt = dii_buy if dii_action == "bought" else dii_sell
-    
-    net_flow = fii_buy - dii_sell if "FII_Buying" in template["name"] else dii_buy - fii_sell
-    total_outflow = fii_sell + dii_sell
-    total_inflow = fii_buy + dii_buy
-    
-    sentiment_map = {
-        "FII_Buying": "Bullish",
-        "DII_Support": "Cautiously Bullish",
-        "Dual_Selling": "Bearish",
-        "Dual_Buying": "Strongly Bullish",
-        "Mixed_Flow": "Neutral to Mixed"
-    }
-    
-    action_map = {
-        "FII_Buying": "upside in growth stocks",
-        "DII_Support": "range-bound consolidation",
-        "Dual_Selling": "correction or downtrend",
-        "Dual_Buying": "strong rally across indices",
-        "Mixed_Flow": "sector-specific moves"
-    }
+COMPILED = compile_templates(TEMPLATES)
+
+# (FII sign, DII sign) of the days each template may describe
+DIRECTIONS = {
+    "FII_Buying": ((1, -1),),
+    "DII_Support": ((-1, 1),),
+    "Dual_Selling": ((-1, -1),),
+    "Dual_Buying": ((1, 1),),
+    "Mixed_Flow": ((1, -1), (-1, 1))
+}
+
+MARKET_ACTION = {
+    "FII_Buying": "upside in growth stocks",
+    "DII_Support": "range-bound consolidation",
+    "Dual_Selling": "correction or downtrend",
+    "Dual_Buying": "strong rally across indices",
+    "Mixed_Flow": "sector-specific moves"
+}
+
+def _signed(amount: int) -> str:
+    return f"{'+' if amount >= 0 else '-'}₹{abs(amount)}Cr"
+
+def _sentiment(p) -> str:
+    """Read the day's flows: agreement sets the tone, FII streaks its strength."""
+    flow = p["flow"]
+    fii, dii = flow["fii_net"], flow["dii_net"]
+    if fii > 0 and dii > 0:
+        return "Strongly Bullish"
+    if fii < 0 and dii < 0:
+        return "Strongly Bearish" if flow["fii_streak"] <= -3 else "Bearish"
+    if fii > 0:
+        return "Bullish" if flow["fii_streak"] >= 3 else "Cautiously Bullish"
+    return "Cautiously Bullish" if fii + dii >= 0 else "Cautiously Bearish"
+
+def _streak_note(who: str):
+    """Sampler describing how long ``who``'s current buying/selling run has lasted."""
+    def note(p) -> str:
+        streak = p["flow"][f"{who.lower()}_streak"]
+        side, days = ("buying" if streak > 0 else "selling"), abs(streak)
+        if days >= 3:
+            return f"{who} {side} has now run {days} straight sessions, so the move has follow-through."
+        sessions = "session" if days == 1 else "sessions"
+        return f"{who} {side} is {days} {sessions} old; continuation needs it to sustain 3+ days."
+    return note
+
+# Every amount derives from one simulated day drawn to match the template
+PARAMS = {
+    "flow": lambda p: flow_bank().pick(DIRECTIONS[p.template.name], p.rng),
+    "fii_buy": lambda p: p["flow"]["fii_net"],
+    "fii_sell": lambda p: -p["flow"]["fii_net"],
+    "dii_buy": lambda p: p["flow"]["dii_net"],
+    "dii_sell": lambda p: -p["flow"]["dii_net"],
+    "fii_action": lambda p: "bought" if p["flow"]["fii_net"] > 0 else "sold",
+    "dii_action": lambda p: "bought" if p["flow"]["dii_net"] > 0 else "sold",
+    "fii_amt": lambda p: abs(p["flow"]["fii_net"]),
+    "dii_amt": lambda p: abs(p["flow"]["dii_net"]),
+    "net_flow": lambda p: _signed(p["flow"]["fii_net"] + p["flow"]["dii_net"]),
+    "total_outflow": lambda p: p["fii_sell"] + p["dii_sell"],
+    "total_inflow": lambda p: p["fii_buy"] + p["dii_buy"],
+    "date": lambda p: p["flow"]["date"],
+    "fii_streak_note": _streak_note("FII"),
+    "dii_streak_note": _streak_note("DII"),
+    "sector": lambda p: p.rng.choice(["IT", "Banking", "Pharma", "Auto", "Metal", "FMCG"]),
+    "sectors": lambda p: ", ".join(p.rng.sample(["IT", "Banking", "Pharma", "Auto", "Energy"], 2)),
+    "sentiment": _sentiment,
+    "market_action": lambda p: MARKET_ACTION.get(p.template.name, "mixed moves"),
+}
+
+# Distinct rendered values of the fields drawn independently of the flow
+# day; every other field is a function of the day
+SPACE = {
+    "sector": 6,
+    "sectors": 5 * 4,
+}
+
+def space_size() -> int:
+    """Upper bound on distinct samples: matching bank days times independent fields, per template."""
+    bank = flow_bank()
+    total = 0
+    for template in COMPILED:
+        combinations = len(bank.days(DIRECTIONS[template.name]))
+        for field in template.fields:
+            combinations *= SPACE.get(field, 1)
+        total += combinations
+    return total
+
+def generate_institutional(seed: int = None, rng: random.Random = None) -> Dict[str, str]:
+    """Generate institutional flow analysis.
+
+    All draws go through ``rng`` (a fresh ``random.Random(seed)`` by default),
+    so concurrent callers never share RNG state.
+    """
+    if rng is None:
+        rng = random.Random(seed)
     
-    params = {
-        "fii_buy": int(fii_buy),
-        "fii_sell": int(fii_sell),
-        "dii_buy": int(dii_buy),
-        "dii_sell": int(dii_sell),
-        "fii_action": fii_action,
-        "dii_action": dii_action,
-        "fii_amt": int(fii_amt),
-        "dii_amt": int(dii_amt),
-        "net_flow": int(net_flow),
-        "total_outflow": int(total_outflow),
-        "total_inflow": int(total_inflow),
-        "date": f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
-        "sector": random.choice(["IT", "Banking", "Pharma", "Auto", "Metal", "FMCG"]),
-        "sectors": ", ".join(random.sample(["IT", "Banking", "Pharma", "Auto", "Energy"], 2)),
-        "sentiment": sentiment_map.get(template["name"], "Mixed"),
-        "market_action": action_map.get(template["name"], "mixed moves")
-    }
+    template = rng.choice(COMPILED)
+    params = template.draw(PARAMS, rng)
     
-    instruction = template["instruction"].format(**params)
-    response = template["response"].format(**params)
+    instruction = template.render("instruction", params)
+    response = template.render("response", params)
     
     return {
         "instruction": instruction,
         "response": response,
         "pattern_type": "institutional",
-        "metadata": {"template": template["name"], "params": params}
+        "metadata": {"template": template.name, "params": dict(params)}
     }
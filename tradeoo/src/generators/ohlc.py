@@ -1,195 +1,286 @@
 """Synthetic OHLC generator for pattern illustration."""
 import numpy as np
-from typing import List, Dict
-from datetime import datetime, timedelta
-
-def generate_ohlc_snippet(pattern: str, num_bars: int = 10, seed: int = None) -> List[Dict]:
-    """Generate synthetic OHLC bars illustrating a specific pattern."""
-    if seed is not None:
-        np.random.seed(seed)
-    
-    base_price = np.random.uniform(100, 500)
-    bars = []
-    
-    if pattern == "uptrend":
-        bars = _generate_uptrend(base_price, num_bars)
-    elif pattern == "downtrend":
-        bars = _generate_downtrend(base_price, num_bars)
-    elif pattern == "breakout":
-        bars = _generate_breakout(base_price, num_bars)
-    elif pattern == "pin_bar":
-        bars = _generate_pin_bar(base_price, num_bars)
-    elif pattern == "engulfing":
-        bars = _generate_engulfing(base_price, num_bars)
-    else:
-        bars = _generate_random_walk(base_price, num_bars)
-    
+from typing import List, Dict, Optional, Union
+from datetime import datetime
+
+from src.detectors import MIN_BARS, verify_pattern
+
+BAR_SECONDS = 5 * 60
+PRICE_FIELDS = ("open", "high", "low", "close")
+
+# Regeneration rounds for series whose bars do not show their label
+MAX_VERIFY_ROUNDS = 10
+
+def generate_ohlc_snippet(pattern: str, num_bars: int = 10, seed: int = None,
+                          rng: np.random.Generator = None, output: str = "records",
+                          price_dtype=np.float64) -> Union[List[Dict], np.ndarray, "pyarrow.RecordBatch"]:
+    """Generate synthetic OHLC bars illustrating a specific pattern.
+
+    Draws come from ``rng`` when given, otherwise from
+    ``np.random.default_rng(seed)`` rather than the legacy global state.
+    ``output`` selects the representation: ``"records"`` (list of dicts),
+    ``"numpy"`` (structured array) or ``"arrow"`` (record batch).
+    """
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    batch = generate_ohlc_batch(pattern, 1, num_bars, rng=rng)
+    if output == "numpy":
+        return batch_to_structured(batch, price_dtype)[0]
+    if output == "arrow":
+        return batch_to_arrow(batch, price_dtype)
+    if output != "records":
+        raise ValueError(f"Unknown OHLC output format: {output}")
+    return batch_to_bars(batch, 0)
+
+def generate_ohlc_batch(pattern: str, num_series: int, num_bars: int = 10,
+                        rng: np.random.Generator = None, seed: int = None,
+                        start: Optional[int] = None, verify: bool = True) -> Dict[str, np.ndarray]:
+    """Generate ``num_series`` OHLC series of ``num_bars`` bars in one shot.
+
+    Returns a dict of ``(num_series, num_bars)`` arrays: ``timestamp`` (int64
+    epoch seconds, 5-minute bars ending now unless ``start`` is given),
+    ``open``/``high``/``low``/``close`` (float64, rounded to 2 decimals) and
+    ``volume`` (int64). Prices are built from cumulative products of
+    per-bar returns, so no Python loop runs per bar or per series.
+
+    With ``verify`` every series is checked by
+    :func:`~src.detectors.verify_pattern` and series that do not show their
+    pattern are redrawn (up to :data:`MAX_VERIFY_ROUNDS` times, then
+    ``ValueError``). Batches that pass first time are unchanged by this.
+    ``num_bars=0`` gives empty series; fewer bars than the pattern needs
+    (:data:`~src.detectors.MIN_BARS`) is a ``ValueError``.
+    """
+    minimum = MIN_BARS.get(pattern, 1)
+    if 0 < num_bars < minimum:
+        raise ValueError(f"{pattern} needs at least {minimum} bars")
+    if rng is None:
+        rng = np.random.default_rng(seed)
+
+    base = rng.uniform(100, 500, size=num_series)
+    shape = (num_series, num_bars)
+    bars = {field: np.empty(shape) for field in PRICE_FIELDS}
+    bars["volume"] = np.empty(shape, dtype=np.int64)
+
+    if num_bars:
+        builder = _BUILDERS.get(pattern, _fill_random_walk)
+        builder(bars, base, num_bars, rng)
+
+    for field in PRICE_FIELDS:
+        np.round(bars[field], 2, out=bars[field])
+
+    if start is None:
+        start = int(datetime.now().timestamp()) - num_bars * BAR_SECONDS
+    offsets = np.arange(num_bars, dtype=np.int64) * BAR_SECONDS
+    bars["timestamp"] = np.broadcast_to(start + offsets, shape)
+    if verify and num_bars:
+        _redraw_mislabeled(bars, pattern, rng, start)
     return bars
 
-def _generate_uptrend(base: float, n: int) -> List[Dict]:
+def _redraw_mislabeled(bars: Dict[str, np.ndarray], pattern: str, rng: np.random.Generator,
+                       start: int) -> None:
+    """Replace series that fail their label check with fresh draws, in place."""
+    failed = np.flatnonzero(~verify_pattern(bars, pattern))
+    for _ in range(MAX_VERIFY_ROUNDS):
+        if not failed.size:
+            return
+        redraw = generate_ohlc_batch(pattern, failed.size, bars["close"].shape[1], rng=rng,
+                                     start=start, verify=False)
+        for field in PRICE_FIELDS + ("volume",):
+            bars[field][failed] = redraw[field]
+        failed = failed[~verify_pattern(redraw, pattern)]
+    if failed.size:
+        raise ValueError(f"{failed.size} {pattern} series still failed verification "
+                         f"after {MAX_VERIFY_ROUNDS} redraws")
+
+def batch_to_bars(batch: Dict[str, np.ndarray], index: int) -> List[Dict]:
+    """Materialize one series of a batch as the legacy list of bar dicts."""
+    columns = {field: batch[field][index].tolist() for field in PRICE_FIELDS + ("volume",)}
+    timestamps = batch["timestamp"][index].tolist()
+    return [
+        {
+            "timestamp": datetime.fromtimestamp(ts).isoformat(),
+            "open": columns["open"][i],
+            "high": columns["high"][i],
+            "low": columns["low"][i],
+            "close": columns["close"][i],
+            "volume": columns["volume"][i]
+        }
+        for i, ts in enumerate(timestamps)
+    ]
+
+def ohlc_dtype(price_dtype=np.float64) -> np.dtype:
+    """Structured dtype for one bar: int64 epoch seconds, prices, int64 volume."""
+    return np.dtype([("timestamp", np.int64)]
+                    + [(field, price_dtype) for field in PRICE_FIELDS]
+                    + [("volume", np.int64)])
+
+def batch_to_structured(batch: Dict[str, np.ndarray], price_dtype=np.float64) -> np.ndarray:
+    """Pack a batch into one ``(num_series, num_bars)`` structured array."""
+    out = np.empty(batch["close"].shape, dtype=ohlc_dtype(price_dtype))
+    for field in out.dtype.names:
+        out[field] = batch[field]
+    return out
+
+def batch_to_arrow(batch: Dict[str, np.ndarray], price_dtype=np.float64) -> "pyarrow.RecordBatch":
+    """Flatten a batch into an Arrow record batch with a ``series`` column."""
+    pa = _pyarrow()
+    num_series, num_bars = batch["close"].shape
+    columns = {
+        "series": pa.array(np.repeat(np.arange(num_series, dtype=np.int32), num_bars)),
+        "timestamp": pa.array(batch["timestamp"].ravel(), type=pa.timestamp("s", tz="UTC")),
+    }
+    for field in PRICE_FIELDS:
+        columns[field] = pa.array(batch[field].ravel().astype(price_dtype, copy=False))
+    columns["volume"] = pa.array(batch["volume"].ravel())
+    return pa.RecordBatch.from_pydict(columns)
+
+def write_ohlc_parquet(batch: Dict[str, np.ndarray], path: str, price_dtype=np.float64,
+                       compression: str = "zstd") -> None:
+    """Write a batch to Parquet so loaders can memory-map the bars."""
+    import pyarrow.parquet as pq
+
+    table = _pyarrow().Table.from_batches([batch_to_arrow(batch, price_dtype)])
+    pq.write_table(table, path, compression=compression)
+
+def read_ohlc_parquet(path: str) -> Dict[str, np.ndarray]:
+    """Read a file written by :func:`write_ohlc_parquet` back into a batch."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    series = table.column("series").to_numpy()
+    num_series = int(series.max()) + 1 if len(series) else 0
+    if num_series and len(series) % num_series:
+        raise ValueError(f"{path}: series have different numbers of bars")
+    shape = (num_series, len(series) // num_series if num_series else 0)
+    batch = {field: table.column(field).to_numpy().astype(np.float64).reshape(shape)
+             for field in PRICE_FIELDS}
+    batch["volume"] = table.column("volume").to_numpy().reshape(shape)
+    # Parquet keeps second-resolution timestamps as milliseconds
+    pa = _pyarrow()
+    seconds = table.column("timestamp").cast(pa.timestamp("s", tz="UTC")).cast(pa.int64())
+    batch["timestamp"] = seconds.to_numpy().reshape(shape)
+    return batch
+
+def _pyarrow():
+    """Import pyarrow on demand; it is only needed for Arrow/Parquet output."""
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Arrow/Parquet output requires pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+def _volume(rng: np.random.Generator, low: float, high: float, size) -> np.ndarray:
+    """Draw integer bar volumes."""
+    return rng.uniform(low, high, size=size).astype(np.int64)
+
+def _fill_trend(bars: Dict[str, np.ndarray], base: np.ndarray, returns: np.ndarray) -> None:
+    """Fill open/close from chained per-bar returns starting at ``base``."""
+    close = base[:, None] * np.cumprod(returns, axis=1)
+    bars["close"][:] = close
+    bars["open"][:, 0] = base
+    bars["open"][:, 1:] = close[:, :-1]
+
+def _fill_uptrend(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
     """Generate uptrending OHLC bars."""
-    bars = []
-    current_price = base
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
-    for i in range(n):
-        open_price = current_price
-        close_price = open_price * np.random.uniform(1.002, 1.015)
-        high_price = close_price * np.random.uniform(1.001, 1.008)
-        low_price = open_price * np.random.uniform(0.995, 0.999)
-        
-        bars.append({
-            "timestamp": (start_time + timedelta(minutes=i*5)).isoformat(),
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": int(np.random.uniform(10000, 50000))
-        })
-        current_price = close_price
-    
-    return bars
+    size = bars["close"].shape
+    _fill_trend(bars, base, rng.uniform(1.002, 1.015, size=size))
+    bars["high"][:] = bars["close"] * rng.uniform(1.001, 1.008, size=size)
+    bars["low"][:] = bars["open"] * rng.uniform(0.995, 0.999, size=size)
+    bars["volume"][:] = _volume(rng, 10000, 50000, size)
 
-def _generate_downtrend(base: float, n: int) -> List[Dict]:
+def _fill_downtrend(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
     """Generate downtrending OHLC bars."""
-    bars = []
-    current_price = base
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
-    for i in range(n):
-        open_price = current_price
-        close_price = open_price * np.random.uniform(0.985, 0.998)
-        high_price = open_price * np.random.uniform(1.001, 1.005)
-        low_price = close_price * np.random.uniform(0.992, 0.999)
-        
-        bars.append({
-            "timestamp": (start_time + timedelta(minutes=i*5)).isoformat(),
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": int(np.random.uniform(10000, 50000))
-        })
-        current_price = close_price
-    
-    return bars
+    size = bars["close"].shape
+    _fill_trend(bars, base, rng.uniform(0.985, 0.998, size=size))
+    bars["high"][:] = bars["open"] * rng.uniform(1.001, 1.005, size=size)
+    bars["low"][:] = bars["close"] * rng.uniform(0.992, 0.999, size=size)
+    bars["volume"][:] = _volume(rng, 10000, 50000, size)
 
-def _generate_breakout(base: float, n: int) -> List[Dict]:
+def _fill_breakout(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
     """Generate consolidation followed by breakout."""
-    bars = []
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
+    breakout = min(3, n)
+    flat = n - breakout
+    size = (base.shape[0], flat)
+
     # Consolidation phase
-    for i in range(n - 3):
-        open_price = base * np.random.uniform(0.998, 1.002)
-        close_price = base * np.random.uniform(0.998, 1.002)
-        high_price = max(open_price, close_price) * np.random.uniform(1.001, 1.003)
-        low_price = min(open_price, close_price) * np.random.uniform(0.997, 0.999)
-        
-        bars.append({
-            "timestamp": (start_time + timedelta(minutes=i*5)).isoformat(),
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": int(np.random.uniform(10000, 30000))
-        })
-    
-    # Breakout bars
-    for i in range(n - 3, n):
-        open_price = base if i == n - 3 else bars[-1]["close"]
-        close_price = open_price * 1.02
-        high_price = close_price * 1.005
-        low_price = open_price * 0.998
-        
-        bars.append({
-            "timestamp": (start_time + timedelta(minutes=i*5)).isoformat(),
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": int(np.random.uniform(50000, 100000))
-        })
-    
-    return bars
+    open_price = base[:, None] * rng.uniform(0.998, 1.002, size=size)
+    close_price = base[:, None] * rng.uniform(0.998, 1.002, size=size)
+    bars["open"][:, :flat] = open_price
+    bars["close"][:, :flat] = close_price
+    bars["high"][:, :flat] = np.maximum(open_price, close_price) * rng.uniform(1.001, 1.003, size=size)
+    bars["low"][:, :flat] = np.minimum(open_price, close_price) * rng.uniform(0.997, 0.999, size=size)
+    bars["volume"][:, :flat] = _volume(rng, 10000, 30000, size)
 
-def _generate_pin_bar(base: float, n: int) -> List[Dict]:
+    # Breakout bars: each closes 2% above its open, which is the prior close
+    growth = 1.02 ** np.arange(breakout + 1)
+    open_price = base[:, None] * growth[:-1]
+    close_price = base[:, None] * growth[1:]
+    bars["open"][:, flat:] = open_price
+    bars["close"][:, flat:] = close_price
+    bars["high"][:, flat:] = close_price * 1.005
+    bars["low"][:, flat:] = open_price * 0.998
+    bars["volume"][:, flat:] = _volume(rng, 50000, 100000, (base.shape[0], breakout))
+
+def _fill_pin_bar(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
     """Generate bars with pin bar at the end."""
-    bars = _generate_random_walk(base, n - 1)
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
+    _fill_random_walk(bars, base, n - 1, rng)
+
     # Add bullish pin bar
-    last_close = bars[-1]["close"] if bars else base
-    open_price = last_close
+    open_price = bars["close"][:, n - 2] if n > 1 else base
     close_price = open_price * 1.005
-    high_price = close_price * 1.002
-    low_price = open_price * 0.97  # Long lower wick
-    
-    bars.append({
-        "timestamp": (start_time + timedelta(minutes=(n-1)*5)).isoformat(),
-        "open": round(open_price, 2),
-        "high": round(high_price, 2),
-        "low": round(low_price, 2),
-        "close": round(close_price, 2),
-        "volume": int(np.random.uniform(30000, 60000))
-    })
-    
-    return bars
+    bars["open"][:, n - 1] = open_price
+    bars["close"][:, n - 1] = close_price
+    bars["high"][:, n - 1] = close_price * 1.002
+    bars["low"][:, n - 1] = open_price * 0.97  # Long lower wick
+    bars["volume"][:, n - 1] = _volume(rng, 30000, 60000, base.shape[0])
 
-def _generate_engulfing(base: float, n: int) -> List[Dict]:
+def _fill_engulfing(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
     """Generate bars with engulfing pattern."""
-    bars = _generate_random_walk(base, n - 2)
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
-    last_close = bars[-1]["close"] if bars else base
-    
+    _fill_random_walk(bars, base, n - 2, rng)
+    series = base.shape[0]
+
     # Small bearish candle
-    open1 = last_close
+    open1 = bars["close"][:, n - 3] if n > 2 else base
     close1 = open1 * 0.995
-    bars.append({
-        "timestamp": (start_time + timedelta(minutes=(n-2)*5)).isoformat(),
-        "open": round(open1, 2),
-        "high": round(open1 * 1.002, 2),
-        "low": round(close1 * 0.998, 2),
-        "close": round(close1, 2),
-        "volume": int(np.random.uniform(20000, 40000))
-    })
-    
+    bars["open"][:, n - 2] = open1
+    bars["close"][:, n - 2] = close1
+    bars["high"][:, n - 2] = open1 * 1.002
+    bars["low"][:, n - 2] = close1 * 0.998
+    bars["volume"][:, n - 2] = _volume(rng, 20000, 40000, series)
+
     # Large bullish engulfing candle
     open2 = close1 * 0.998
     close2 = open1 * 1.01
-    bars.append({
-        "timestamp": (start_time + timedelta(minutes=(n-1)*5)).isoformat(),
-        "open": round(open2, 2),
-        "high": round(close2 * 1.003, 2),
-        "low": round(open2 * 0.997, 2),
-        "close": round(close2, 2),
-        "volume": int(np.random.uniform(50000, 80000))
-    })
-    
-    return bars
+    bars["open"][:, n - 1] = open2
+    bars["close"][:, n - 1] = close2
+    bars["high"][:, n - 1] = close2 * 1.003
+    bars["low"][:, n - 1] = open2 * 0.997
+    bars["volume"][:, n - 1] = _volume(rng, 50000, 80000, series)
 
-def _generate_random_walk(base: float, n: int) -> List[Dict]:
-    """Generate random walk OHLC bars."""
-    bars = []
-    current_price = base
-    start_time = datetime.now() - timedelta(minutes=n*5)
-    
-    for i in range(n):
-        direction = np.random.choice([-1, 1])
-        open_price = current_price
-        close_price = open_price * (1 + direction * np.random.uniform(0.002, 0.01))
-        high_price = max(open_price, close_price) * np.random.uniform(1.001, 1.005)
-        low_price = min(open_price, close_price) * np.random.uniform(0.995, 0.999)
-        
-        bars.append({
-            "timestamp": (start_time + timedelta(minutes=i*5)).isoformat(),
-            "open": round(open_price, 2),
-            "high": round(high_price, 2),
-            "low": round(low_price, 2),
-            "close": round(close_price, 2),
-            "volume": int(np.random.uniform(10000, 50000))
-        })
-        current_price = close_price
-    
-    return bars
+def _fill_random_walk(bars: Dict[str, np.ndarray], base: np.ndarray, n: int, rng: np.random.Generator) -> None:
+    """Generate random walk OHLC bars into the first ``n`` columns."""
+    if n <= 0:
+        return
+    size = (base.shape[0], n)
+    direction = rng.choice([-1, 1], size=size)
+    returns = 1 + direction * rng.uniform(0.002, 0.01, size=size)
+    close_price = base[:, None] * np.cumprod(returns, axis=1)
+    open_price = np.empty(size)
+    open_price[:, 0] = base
+    open_price[:, 1:] = close_price[:, :-1]
+    bars["open"][:, :n] = open_price
+    bars["close"][:, :n] = close_price
+    bars["high"][:, :n] = np.maximum(open_price, close_price) * rng.uniform(1.001, 1.005, size=size)
+    bars["low"][:, :n] = np.minimum(open_price, close_price) * rng.uniform(0.995, 0.999, size=size)
+    bars["volume"][:, :n] = _volume(rng, 10000, 50000, size)
+
+_BUILDERS = {
+    "uptrend": _fill_uptrend,
+    "downtrend": _fill_downtrend,
+    "breakout": _fill_breakout,
+    "pin_bar": _fill_pin_bar,
+    "engulfing": _fill_engulfing,
+}
+
+PATTERNS = tuple(_BUILDERS)
@@ -2,6 +2,8 @@
 import random
 from typing import Dict, List
 
+from src.generators.templates import compile_templates
+
 TEMPLATES = [
     {
         "name": "EMA_Crossover",
@@ -91,34 +93,58 @@ plot(htfEMA, color=color.purple, linewidth=2)"""
     }
 ]
 
-def generate_pinescript(seed: int = None) -> Dict[str, str]:
-    """Generate a random PineScript strategy."""
-    if seed is not None:
-        random.seed(seed)
-    
-    template = random.choice(TEMPLATES)
+COMPILED = compile_templates(TEMPLATES)
+
+# Samplers for every template field; each template only draws what it references
+PARAMS = {
+    "fast_len": lambda p: p.rng.randint(8, 21),
+    "slow_len": lambda p: p.rng.randint(50, 200),
+    "rsi_len": lambda p: p.rng.randint(10, 21),
+    "ema_len": lambda p: p.rng.randint(20, 100),
+    "oversold": lambda p: p.rng.randint(20, 35),
+    "overbought": lambda p: p.rng.randint(65, 80),
+    "bb_len": lambda p: p.rng.randint(15, 25),
+    "bb_mult": lambda p: round(p.rng.uniform(1.5, 2.5), 1),
+    "tp_pct": lambda p: round(p.rng.uniform(0.5, 3.0), 2),
+    "sl_pct": lambda p: round(p.rng.uniform(0.3, 2.0), 2),
+    "htf": lambda p: p.rng.choice(["15", "60", "240", "D"]),
+    "htf_len": lambda p: p.rng.randint(20, 50),
+}
+
+# Distinct rendered values per field, bounding the (template, params) space
+SPACE = {
+    "fast_len": 14,
+    "slow_len": 151,
+    "rsi_len": 12,
+    "ema_len": 81,
+    "oversold": 16,
+    "overbought": 16,
+    "bb_len": 11,
+    "bb_mult": 11,
+    "tp_pct": 251,
+    "sl_pct": 171,
+    "htf": 4,
+    "htf_len": 31,
+}
+
+def generate_pinescript(seed: int = None, rng: random.Random = None) -> Dict[str, str]:
+    """Generate a random PineScript strategy.
+
+    Pass ``rng`` to draw from a caller-owned ``random.Random``; otherwise a
+    private instance seeded with ``seed`` is used.
+    """
+    if rng is None:
+        rng = random.Random(seed)
     
-    params = {
-        "fast_len": random.randint(8, 21),
-        "slow_len": random.randint(50, 200),
-        "rsi_len": random.randint(10, 21),
-        "ema_len": random.randint(20, 100),
-        "oversold": random.randint(20, 35),
-        "overbought": random.randint(65, 80),
-        "bb_len": random.randint(15, 25),
-        "bb_mult": round(random.uniform(1.5, 2.5), 1),
-        "tp_pct": round(random.uniform(0.5, 3.0), 2),
-        "sl_pct": round(random.uniform(0.3, 2.0), 2),
-        "htf": random.choice(["15", "60", "240", "D"]),
-        "htf_len": random.randint(20, 50),
-    }
+    template = rng.choice(COMPILED)
+    params = template.draw(PARAMS, rng)
     
-    instruction = template["instruction"].format(**params)
-    response = template["code"].format(**params)
+    instruction = template.render("instruction", params)
+    response = template.render("code", params)
     
     return {
         "instruction": instruction,
         "response": response,
         "pattern_type": "pinescript",
-        "metadata": {"template": template["name"], "params": params}
+        "metadata": {"template": template.name, "params": dict(params)}
     }
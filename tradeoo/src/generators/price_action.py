@@ -1,8 +1,9 @@
 """Price action pattern generator."""
 import random
-import numpy as np
 from typing import Dict, List
 
+from src.generators.templates import compile_templates
+
 TEMPLATES = [
     {
         "name": "Retest",
@@ -46,31 +47,46 @@ TEMPLATES = [
     }
 ]
 
-def generate_price_action(seed: int = None) -> Dict[str, str]:
-    """Generate price action explanation."""
-    if seed is not None:
-        random.seed(seed)
-    
-    template = random.choice(TEMPLATES)
+COMPILED = compile_templates(TEMPLATES)
+
+PARAMS = {
+    "price": lambda p: round(p.rng.uniform(100, 500), 2),
+    "timeframe": lambda p: p.rng.choice(["5m", "15m", "1h", "4h", "1D"]),
+    "pattern_type": lambda p: p.rng.choice(["triangle", "rectangle", "channel", "wedge"]),
+    "level": lambda p: round(p.rng.uniform(100, 500), 2),
+    "location": lambda p: p.rng.choice(["support", "resistance", "key level", "trendline"]),
+    "direction": lambda p: p.rng.choice(["Bullish", "Bearish"]),
+    "start": lambda p: round(p.rng.uniform(100, 300), 2),
+    "end": lambda p: round(p.rng.uniform(300, 500), 2),
+}
+
+# Distinct rendered values per field, bounding the (template, params) space
+SPACE = {
+    "price": 40001,
+    "timeframe": 5,
+    "pattern_type": 4,
+    "level": 40001,
+    "location": 4,
+    "direction": 2,
+    "start": 20001,
+    "end": 20001,
+}
+
+def generate_price_action(seed: int = None, rng: random.Random = None) -> Dict[str, str]:
+    """Generate price action explanation using ``rng`` or ``random.Random(seed)``."""
+    if rng is None:
+        rng = random.Random(seed)
     
-    params = {
-        "price": round(random.uniform(100, 500), 2),
-        "timeframe": random.choice(["5m", "15m", "1h", "4h", "1D"]),
-        "pattern_type": random.choice(["triangle", "rectangle", "channel", "wedge"]),
-        "level": round(random.uniform(100, 500), 2),
-        "location": random.choice(["support", "resistance", "key level", "trendline"]),
-        "direction": random.choice(["Bullish", "Bearish"]),
-        "start": round(random.uniform(100, 300), 2),
-        "end": round(random.uniform(300, 500), 2),
-    }
+    template = rng.choice(COMPILED)
+    params = template.draw(PARAMS, rng)
     
-    instruction = template["instruction"].format(**params)
-    response = template["response"].format(**params)
+    instruction = template.render("instruction", params)
+    response = template.render("response", params)
     
     return {
         "instruction": instruction,
         "response": response,
         "pattern_type": "price_action",
         "timeframe": params.get("timeframe"),
-        "metadata": {"template": template["name"], "params": params}
+        "metadata": {"template": template.name, "params": dict(params)}
     }
@@ -0,0 +1,95 @@
+"""Precompiled template rendering shared by the template-based generators."""
+import random
+from string import Formatter
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class LazyParams(dict):
+    """Parameter dict that draws each value the first time it is looked up.
+
+    Samplers receive this dict, so derived values can read ``params.rng``,
+    ``params.template`` and other parameters (drawing them on demand).
+    """
+
+    def __init__(self, samplers: Dict[str, Callable[["LazyParams"], Any]],
+                 rng: random.Random, template: "CompiledTemplate"):
+        super().__init__()
+        self.samplers = samplers
+        self.rng = rng
+        self.template = template
+
+    def __missing__(self, key: str) -> Any:
+        value = self[key] = self.samplers[key](self)
+        return value
+
+
+class CompiledTemplate:
+    """A ``TEMPLATES`` entry parsed once into literal chunks and field names."""
+
+    def __init__(self, entry: Dict[str, str]):
+        self.name = entry["name"]
+        self.parts: Dict[str, Tuple[List[str], List[str]]] = {}
+        fields: List[str] = []
+        for key, text in entry.items():
+            if key == "name":
+                continue
+            literals, refs = _parse(text)
+            self.parts[key] = (literals, refs)
+            fields.extend(field for field in refs if field not in fields)
+        self.fields = tuple(fields)
+
+    def draw(self, samplers: Dict[str, Callable[[LazyParams], Any]], rng: random.Random) -> Dict[str, Any]:
+        """Draw only the parameters this template references, in field order."""
+        params = LazyParams(samplers, rng, self)
+        for field in self.fields:
+            params[field]
+        return params
+
+    def space(self, sizes: Dict[str, int]) -> int:
+        """Upper bound on distinct renderings: the product of field cardinalities."""
+        total = 1
+        for field in self.fields:
+            total *= sizes[field]
+        return total
+
+    def render(self, key: str, params: Dict[str, Any]) -> str:
+        """Render one part (e.g. ``"instruction"``) by joining chunks."""
+        literals, refs = self.parts[key]
+        pieces = [literals[0]]
+        for field, literal in zip(refs, literals[1:]):
+            pieces.append(str(params[field]))
+            pieces.append(literal)
+        return "".join(pieces)
+
+
+def compile_templates(templates: List[Dict[str, str]]) -> List[CompiledTemplate]:
+    """Compile every entry of a generator's ``TEMPLATES`` list."""
+    return [CompiledTemplate(entry) for entry in templates]
+
+
+def space_size(compiled: List[CompiledTemplate], sizes: Dict[str, int]) -> int:
+    """Upper bound on the distinct samples a generator can produce.
+
+    ``sizes`` maps every field to the number of distinct values it can
+    render as; derived fields count their own rendered values.
+    """
+    return sum(template.space(sizes) for template in compiled)
+
+
+def _parse(text: str) -> Tuple[List[str], List[str]]:
+    """Split a ``str.format`` template into literals and field names.
+
+    ``literals`` always has one more entry than ``refs``; rendering
+    interleaves them. Conversions and format specs are not supported.
+    """
+    literals = [""]
+    refs = []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        literals[-1] += literal
+        if field is None:
+            continue
+        if spec or conversion:
+            raise ValueError(f"Unsupported format spec in template field {field!r}")
+        refs.append(field)
+        literals.append("")
+    return literals, refs
@@ -0,0 +1,129 @@
+"""Background job queue for long-running dataset generation."""
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from src.engine import GenerationCancelled
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 100
+
+
+class Job:
+    """State of one background job; ``advance`` is its progress callback."""
+
+    def __init__(self, kind: str, total: int, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.total = total
+        self.params = params
+        self.done = 0
+        self.status = 'queued'
+        self.created_at = datetime.now().isoformat()
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def advance(self, rows: int) -> None:
+        """Record finished rows; raises :class:`GenerationCancelled` once cancelled."""
+        if self._cancel.is_set():
+            raise GenerationCancelled(self.id)
+        with self._lock:
+            self.done += rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready snapshot including progress, rows/sec and ETA."""
+        with self._lock:
+            done = self.done
+        elapsed = None
+        rate = None
+        eta = None
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+            if elapsed > 0 and done:
+                rate = done / elapsed
+                if self.status == 'running':
+                    eta = max(self.total - done, 0) / rate
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'total': self.total,
+            'done': done,
+            'progress': round(done / self.total, 4) if self.total else 1.0,
+            'rows_per_sec': round(rate, 1) if rate else None,
+            'elapsed_seconds': round(elapsed, 2) if elapsed is not None else None,
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+            'created_at': self.created_at,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """Runs jobs on a local thread pool and tracks them by id."""
+
+    def __init__(self, max_workers: int = 2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, total: int, params: Dict[str, Any],
+               fn: Callable[[Job], Dict]) -> Job:
+        """Queue ``fn(job)``; it should report rows through ``job.advance``."""
+        job = Job(kind, total, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; queued jobs are cancelled immediately."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status = 'cancelled'
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Dict]) -> None:
+        if job._cancel.is_set():
+            job.status = 'cancelled'
+            return
+        job.status = 'running'
+        job._started = time.monotonic()
+        try:
+            job.result = fn(job)
+            job.status = 'completed'
+        except GenerationCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job._finished = time.monotonic()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond :data:`MAX_FINISHED_JOBS`."""
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.status in ('completed', 'failed', 'cancelled')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
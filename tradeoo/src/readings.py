@@ -0,0 +1,184 @@
+"""Indicator readings and signal times for PineScript strategy samples.
+
+Each strategy row is evaluated on one series from a shared bank of
+synthetic 5-minute bars (picked by the row's seed), using the row's own
+parameters, and gains ``metadata["readings"]``. This includes the last
+value of every indicator the script plots or trades on, and the times of
+its most recent entry/exit signals. Rows are processed in chunks grouped by
+template, so each indicator runs once per chunk over a ``(rows, bars)``
+array with one length per row (:mod:`src.indicators`). An indicator
+whose lookback is longer than the bank has no reading (``None``), and the
+signals that depend on it are not reported.
+"""
+import zlib
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from src.generators.ohlc import BAR_SECONDS, generate_ohlc_batch
+from src.indicators import bollinger, crosses, ema, rsi, vwap
+
+# The shared bank readings are computed over
+BAR_BANK_SEED = 20240101
+BAR_BANK_SERIES = 512
+BAR_BANK_BARS = 400
+BAR_BANK_START = 1704067200  # 2024-01-01 00:00 UTC
+
+# Most recent signals kept per row (signal_count has the total)
+MAX_SIGNALS = 3
+CHUNK_ROWS = 4096
+
+HTF_MINUTES = {"15": 15, "60": 60, "240": 240, "D": 24 * 60}
+
+Bars = Dict[str, np.ndarray]
+Evaluation = Tuple[Dict[str, np.ndarray], np.ndarray]
+
+
+@lru_cache(maxsize=1)
+def bar_bank(seed: int = BAR_BANK_SEED) -> Bars:
+    """The process-wide bank of random-walk bars, built on first use."""
+    return generate_ohlc_batch("random_walk", BAR_BANK_SERIES, BAR_BANK_BARS,
+                               seed=seed, start=BAR_BANK_START)
+
+
+def _column(params: List[Dict], key: str) -> np.ndarray:
+    return np.array([p[key] for p in params], dtype=np.float64)
+
+
+def _within_bank(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Blank the rows of ``values`` whose lookback exceeds :data:`BAR_BANK_BARS`.
+
+    Those rows are NaN, so they read as ``None`` and never cross or compare true.
+    """
+    values[lengths > BAR_BANK_BARS] = np.nan
+    return values
+
+
+def _signed(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    return buy.astype(np.int8) - sell.astype(np.int8)
+
+
+def _onsets(state: np.ndarray) -> np.ndarray:
+    """Keep ``state`` only on bars where it changes to a non-zero value."""
+    previous = np.zeros_like(state)
+    previous[:, 1:] = state[:, :-1]
+    return np.where(state != previous, state, 0).astype(np.int8)
+
+
+def _ema_crossover(bars: Bars, params: List[Dict]) -> Evaluation:
+    close = bars["close"]
+    fast_len, slow_len = _column(params, "fast_len"), _column(params, "slow_len")
+    fast = _within_bank(ema(close, fast_len), fast_len)
+    slow = _within_bank(ema(close, slow_len), slow_len)
+    return {"fast_ema": fast, "slow_ema": slow}, crosses(fast, slow)
+
+
+def _rsi_ema(bars: Bars, params: List[Dict]) -> Evaluation:
+    close = bars["close"]
+    rsi_len, ema_len = _column(params, "rsi_len"), _column(params, "ema_len")
+    strength = _within_bank(rsi(close, rsi_len), rsi_len)
+    trend = _within_bank(ema(close, ema_len), ema_len)
+    buy = (crosses(strength, _column(params, "oversold")[:, None]) == 1) & (close > trend)
+    sell = (crosses(strength, _column(params, "overbought")[:, None]) == -1) & (close < trend)
+    return {"rsi": strength, "ema": trend}, _signed(buy, sell)
+
+
+def _bollinger_breakout(bars: Bars, params: List[Dict]) -> Evaluation:
+    close = bars["close"]
+    bb_len = _column(params, "bb_len")
+    basis, upper, lower = (_within_bank(band, bb_len)
+                           for band in bollinger(close, bb_len, _column(params, "bb_mult")))
+    signals = _signed(crosses(close, upper) == 1, crosses(close, lower) == -1)
+    return {"basis": basis, "upper": upper, "lower": lower}, signals
+
+
+def _vwap_scalper(bars: Bars, params: List[Dict]) -> Evaluation:
+    close = bars["close"]
+    value = vwap(close, bars["volume"], bars["timestamp"])
+    return {"vwap": value}, crosses(close, value)
+
+
+def _multi_timeframe(bars: Bars, params: List[Dict]) -> Evaluation:
+    # The higher-timeframe EMA is approximated on the chart bars with its
+    # length scaled by the bars per HTF bar; 240 and D lengths exceed the bank
+    close = bars["close"]
+    per_htf_bar = np.array([HTF_MINUTES[p["htf"]] * 60 // BAR_SECONDS for p in params])
+    htf_len, rsi_len = _column(params, "htf_len") * per_htf_bar, _column(params, "rsi_len")
+    htf_ema = _within_bank(ema(close, htf_len), htf_len)
+    strength = _within_bank(rsi(close, rsi_len), rsi_len)
+    with np.errstate(invalid="ignore"):
+        state = _signed((close > htf_ema) & (strength < 30), (close < htf_ema) & (strength > 70))
+    return {"htf_ema": htf_ema, "rsi": strength}, _onsets(state)
+
+
+# Template name -> (indicator series, +1 buy / -1 sell signals) for a group of rows
+EVALUATORS: Dict[str, Callable[[Bars, List[Dict]], Evaluation]] = {
+    "EMA_Crossover": _ema_crossover,
+    "RSI_EMA": _rsi_ema,
+    "Bollinger_Breakout": _bollinger_breakout,
+    "VWAP_Scalper": _vwap_scalper,
+    "Multi_Timeframe": _multi_timeframe,
+}
+
+
+def _series_for(row: Dict) -> int:
+    seed = row.get("seed")
+    if seed is None:
+        seed = zlib.crc32(str(row.get("id", "")).encode())
+    return seed % BAR_BANK_SERIES
+
+
+def _rounded(values: np.ndarray) -> List:
+    return [None if value != value else value for value in np.round(values, 2).tolist()]
+
+
+def add_readings(rows: List[Dict]) -> int:
+    """Attach ``metadata["readings"]`` to the PineScript rows in ``rows`` (in place).
+
+    Rows of other categories, or without a known template and params, are
+    left untouched. Returns the number of rows annotated.
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for row in rows:
+        metadata = row.get("metadata") or {}
+        if (row.get("pattern_type") == "pinescript" and metadata.get("template") in EVALUATORS
+                and metadata.get("params")):
+            groups.setdefault(metadata["template"], []).append(row)
+
+    bank = bar_bank()
+    for template, group in groups.items():
+        series = np.array([_series_for(row) for row in group])
+        bars = {field: values[series] for field, values in bank.items()}
+        values, signals = EVALUATORS[template](bars, [row["metadata"]["params"] for row in group])
+
+        latest = {"close": _rounded(bars["close"][:, -1])}
+        latest.update((name, _rounded(column[:, -1])) for name, column in values.items())
+        hit_rows, hit_bars = np.nonzero(signals)
+        times = bars["timestamp"][hit_rows, hit_bars].astype("datetime64[s]").astype(str).tolist()
+        sides = np.where(signals[hit_rows, hit_bars] > 0, "buy", "sell").tolist()
+        counts = np.bincount(hit_rows, minlength=len(group)).tolist()
+        end = 0
+        for index, row in enumerate(group):
+            end += counts[index]
+            recent = range(max(end - counts[index], end - MAX_SIGNALS), end)
+            row["metadata"]["readings"] = {
+                "series": int(series[index]),
+                "bars": BAR_BANK_BARS,
+                "values": {name: column[index] for name, column in latest.items()},
+                "signals": [{"time": times[i], "side": sides[i]} for i in recent],
+                "signal_count": counts[index],
+            }
+    return sum(len(group) for group in groups.values())
+
+
+def annotate_rows(rows: Iterable[Dict], chunk_rows: int = CHUNK_ROWS) -> Iterator[Dict]:
+    """Yield ``rows`` in order with readings added to PineScript rows, ``chunk_rows`` at a time."""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        add_readings(chunk)
+        yield from chunk
@@ -18,6 +18,29 @@ class TrainingExample(BaseModel):
     language: str = Field("en", description="Language code")
     metadata: Optional[dict] = Field(default_factory=dict, description="Additional metadata")
 
+# (name, required, static default, default factory) in model field order
+_FIELD_DEFAULTS = [
+    (name, field.is_required(), field.default, field.default_factory)
+    for name, field in TrainingExample.model_fields.items()
+]
+
+def trusted_example(**values) -> dict:
+    """Build a row equal to ``TrainingExample(**values).model_dump()`` without validation.
+
+    Only for generator output already known to satisfy the schema; missing
+    optional fields get the model's defaults, so the row keeps the model's
+    field order and shape.
+    """
+    row = {}
+    for name, required, default, factory in _FIELD_DEFAULTS:
+        if name in values:
+            row[name] = values[name]
+        elif required:
+            raise TypeError(f"Missing required field: {name}")
+        else:
+            row[name] = factory() if factory is not None else default
+    return row
+
 class OHLCBar(BaseModel):
     """Single OHLC bar."""
     timestamp: str
@@ -0,0 +1,389 @@
+"""JSON/JSONL serialization with a pluggable fast backend.
+
+``orjson`` is used when installed, then ``msgspec``, then the stdlib ``json``
+module. All backends emit compact UTF-8 JSON with the same field order and
+separators, but float formatting differs (``json`` writes ``1e-05`` and
+``1e+20`` where ``orjson`` writes ``0.00001`` and ``1e20``), so output is only
+byte-identical under the same backend. Resuming or appending to a
+checkpointed dataset must use the backend that wrote it (pin one with
+``TRADEOO_JSON``).
+
+Files ending in ``.gz`` or ``.zst`` are compressed on write and decompressed
+on read. Gzip output is a series of independent members (one per buffer,
+compressed on a thread pool); zstd output uses zstandard's worker threads.
+"""
+import gzip
+import io
+import json
+import os
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import (Any, Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional,
+                    Tuple, Union)
+
+# Large buffers keep multi-GB reads and writes from being syscall-bound
+BUFFER_SIZE = 1024 * 1024
+
+# File suffix for each supported compression
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# Threads compressing output; zlib and zstd release the GIL while they work
+COMPRESSION_THREADS = min(4, os.cpu_count() or 1)
+
+
+class Backend(NamedTuple):
+    """Encoder/decoder pair; ``dumps_line`` returns one JSONL line as bytes."""
+    name: str
+    dumps_line: Callable[[Any], bytes]
+    loads: Callable[[Union[bytes, str]], Any]
+
+
+def _stdlib_backend() -> Backend:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return Backend('json', lambda obj: (encoder.encode(obj) + '\n').encode('utf-8'), json.loads)
+
+
+def _orjson_backend() -> Backend:
+    import orjson
+    return Backend('orjson', lambda obj: orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE), orjson.loads)
+
+
+def _msgspec_backend() -> Backend:
+    import msgspec
+    encoder = msgspec.json.Encoder()
+    return Backend('msgspec', lambda obj: encoder.encode(obj) + b'\n', msgspec.json.decode)
+
+
+BACKENDS: Dict[str, Callable[[], Backend]] = {
+    'orjson': _orjson_backend,
+    'msgspec': _msgspec_backend,
+    'json': _stdlib_backend,
+}
+
+_backend: Backend = None
+
+
+def set_backend(name: str = None) -> str:
+    """Select a backend by name, or the fastest importable one when ``None``.
+
+    The ``TRADEOO_JSON`` environment variable overrides the automatic choice.
+    Returns the name of the active backend.
+    """
+    global _backend
+    name = name or os.environ.get('TRADEOO_JSON')
+    if name:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend: {name}")
+        _backend = BACKENDS[name]()
+        return _backend.name
+    for factory in BACKENDS.values():
+        try:
+            _backend = factory()
+            return _backend.name
+        except ImportError:
+            continue
+    raise RuntimeError("No JSON backend available")
+
+
+def get_backend() -> Backend:
+    """Return the active backend, selecting one on first use."""
+    if _backend is None:
+        set_backend()
+    return _backend
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON (without a trailing newline)."""
+    return get_backend().dumps_line(obj)[:-1]
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse one JSON document."""
+    return get_backend().loads(data)
+
+
+def compression_for(path: str) -> Optional[str]:
+    """Compression implied by a file name (``"gzip"``, ``"zstd"`` or ``None``)."""
+    for name, suffix in COMPRESSION_SUFFIXES.items():
+        if str(path).endswith(suffix):
+            return name
+    return None
+
+
+def with_compression(path: str, compression: Optional[str]) -> str:
+    """Add the suffix for ``compression`` to ``path`` unless it is already there."""
+    if compression is None or compression_for(path) == compression:
+        return str(path)
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression}")
+    return str(path) + COMPRESSION_SUFFIXES[compression]
+
+
+def strip_compression(path: str) -> str:
+    """Remove a compression suffix, e.g. ``data.jsonl.gz`` -> ``data.jsonl``."""
+    compression = compression_for(path)
+    return str(path)[:-len(COMPRESSION_SUFFIXES[compression])] if compression else str(path)
+
+
+def _zstandard():
+    """Import zstandard on demand; it is only needed for ``.zst`` files."""
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError("zstd compression requires zstandard: pip install zstandard") from exc
+    return zstandard
+
+
+def _gzip_member(block: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(block) + compressor.flush()
+
+
+class _GzipMembers(io.RawIOBase):
+    """Write each block as its own gzip member, compressing blocks in parallel.
+
+    Concatenated members form a valid gzip file, so the output can be read
+    by any gzip reader and members can be appended after a :meth:`sync`.
+    """
+
+    def __init__(self, raw: IO[bytes], level: int = 6, threads: int = COMPRESSION_THREADS):
+        self._raw = raw
+        self._level = level
+        self._window = 2 * threads
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self._pending = deque()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        block = bytes(data)
+        self._pending.append(self._pool.submit(_gzip_member, block, self._level))
+        # Write finished members in order, keeping a bounded number in flight
+        while len(self._pending) > self._window or (self._pending and self._pending[0].done()):
+            self._raw.write(self._pending.popleft().result())
+        return len(block)
+
+    def sync(self) -> None:
+        while self._pending:
+            self._raw.write(self._pending.popleft().result())
+        self._raw.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.sync()
+            self._pool.shutdown()
+            self._raw.close()
+        super().close()
+
+
+class _ZstdFrames(io.RawIOBase):
+    """Zstandard writer; :meth:`sync` ends the current frame."""
+
+    def __init__(self, raw: IO[bytes], level: int = 3, threads: int = COMPRESSION_THREADS):
+        self._zstd = _zstandard()
+        self._raw = raw
+        compressor = self._zstd.ZstdCompressor(level=level, threads=threads if threads > 1 else 0)
+        self._writer = compressor.stream_writer(raw, closefd=False)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._writer.write(data)
+        return len(data)
+
+    def sync(self) -> None:
+        self._writer.flush(self._zstd.FLUSH_FRAME)
+        self._raw.flush()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._writer.close()
+            self._raw.close()
+        super().close()
+
+
+_COMPRESSORS = {'gzip': _GzipMembers, 'zstd': _ZstdFrames}
+
+
+class JsonlWriter:
+    """Buffered JSONL writer; use as a context manager.
+
+    ``compression`` defaults to the one implied by the file name (see
+    :func:`compression_for`).
+    """
+
+    def __init__(self, path: str, buffer_size: int = BUFFER_SIZE, append: bool = False,
+                 compression: Optional[str] = None, threads: int = COMPRESSION_THREADS):
+        mode = 'ab' if append else 'wb'
+        compression = compression or compression_for(path)
+        if compression is None:
+            self._raw = None
+            self._file: IO[bytes] = open(path, mode, buffering=buffer_size)
+        else:
+            self._raw = open(path, mode)
+            self._stream = _COMPRESSORS[compression](self._raw, threads=threads)
+            self._file = io.BufferedWriter(self._stream, buffer_size=buffer_size)
+        self._dumps_line = get_backend().dumps_line
+
+    def write(self, obj: Any) -> None:
+        self._file.write(self._dumps_line(obj))
+
+    def write_all(self, rows: Iterable[Any]) -> int:
+        """Write every row and return how many were written."""
+        written = 0
+        write, dumps_line = self._file.write, self._dumps_line
+        for row in rows:
+            write(dumps_line(row))
+            written += 1
+        return written
+
+    def tell(self) -> int:
+        """Byte offset of the end of the last written row.
+
+        For compressed files this is only meaningful right after :meth:`sync`.
+        """
+        return (self._raw or self._file).tell()
+
+    def sync(self) -> None:
+        """Flush buffered rows and force them to disk.
+
+        Compressed output ends its current gzip member or zstd frame, so the
+        file can be truncated here and appended to later.
+        """
+        self._file.flush()
+        if self._raw is not None:
+            self._stream.sync()
+        os.fsync((self._raw or self._file).fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_jsonl_chunks(rows: Iterable[Any], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode rows as JSONL and yield them in chunks of roughly ``chunk_size`` bytes."""
+    dumps_line = get_backend().dumps_line
+    pending: List[bytes] = []
+    pending_bytes = 0
+    for row in rows:
+        line = dumps_line(row)
+        pending.append(line)
+        pending_bytes += len(line)
+        if pending_bytes >= chunk_size:
+            yield b''.join(pending)
+            pending, pending_bytes = [], 0
+    if pending:
+        yield b''.join(pending)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally, flushing after every chunk.
+
+    Each flush ends on a byte boundary, so a client can decompress and use
+    everything received so far without waiting for the end of the stream.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def open_dataset(path: str, buffer_size: int = BUFFER_SIZE) -> IO[bytes]:
+    """Open a dataset for binary reading, decompressing ``.gz``/``.zst`` files."""
+    compression = compression_for(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        reader = _zstandard().ZstdDecompressor().stream_reader(
+            open(path, 'rb'), read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader, buffer_size=buffer_size)
+    return open(path, 'rb', buffering=buffer_size)
+
+
+def iter_lines(path: str, buffer_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """Yield raw lines (including blank ones) from a JSONL file."""
+    with open_dataset(path, buffer_size) as f:
+        yield from f
+
+
+def iter_line_batches(path: str, batch_bytes: int = 8 * BUFFER_SIZE) -> Iterator[List[bytes]]:
+    """Yield the lines of a (possibly compressed) file in lists of about ``batch_bytes``."""
+    batch: List[bytes] = []
+    size = 0
+    for line in iter_lines(path):
+        batch.append(line)
+        size += len(line)
+        if size >= batch_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def map_line_batches(pool: Executor, fn: Callable, path: str, *args, window: int = 8) -> Iterator[Any]:
+    """Yield ``fn(batch, *args)`` for each line batch of ``path``, in file order.
+
+    Compressed files cannot be split into byte ranges, so the caller's
+    process decompresses and ``pool`` does the parsing, with at most
+    ``window`` batches in flight to bound memory.
+    """
+    pending = deque()
+    for batch in iter_line_batches(path):
+        pending.append(pool.submit(fn, batch, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def iter_jsonl(path: str, buffer_size: int = BUFFER_SIZE) -> Iterator[Any]:
+    """Yield parsed objects from a JSONL file, skipping blank lines."""
+    decode = get_backend().loads
+    for line in iter_lines(path, buffer_size):
+        if line.strip():
+            yield decode(line)
+
+
+def split_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """Split a file into up to ``parts`` byte ranges that end on newlines.
+
+    Each range starts at the beginning of a line, so ranges can be read
+    independently (e.g. by worker processes) without splitting a row.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for k in range(1, parts):
+            target = size * k // parts
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def iter_range_lines(path: str, start: int, end: int, buffer_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """Yield the raw lines in ``[start, end)`` of a file split by :func:`split_ranges`."""
+    with open(path, 'rb', buffering=buffer_size) as f:
+        f.seek(start)
+        remaining = end - start
+        for line in f:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            yield line
@@ -0,0 +1,169 @@
+"""Single-pass, memory-mapped dataset statistics."""
+import concurrent.futures
+import mmap
+import os
+from collections import Counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.serialization import compression_for, iter_lines, loads, map_line_batches, split_ranges
+
+# Upper bounds (in characters) of the length histogram buckets
+LENGTH_BUCKETS = (64, 128, 256, 512, 1024, 2048)
+
+# Rough characters-per-token ratio for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+
+# (pattern_type, timeframe, template, instruction_chars, response_chars)
+RowFields = Tuple[str, Optional[str], Optional[str], int, int]
+
+
+def _generic_decoder() -> Callable[[bytes], RowFields]:
+    """Extract the stats fields from a fully parsed row."""
+    def decode(line: bytes) -> RowFields:
+        obj = loads(line)
+        metadata = obj.get('metadata')
+        template = metadata.get('template') if isinstance(metadata, dict) else None
+        return (obj.get('pattern_type', 'unknown'), obj.get('timeframe'), template,
+                len(obj.get('instruction') or ''), len(obj.get('response') or ''))
+    return decode
+
+
+def _msgspec_decoder() -> Callable[[bytes], RowFields]:
+    """Decode only the stats fields; msgspec skips everything else unparsed."""
+    import msgspec
+
+    class Metadata(msgspec.Struct):
+        template: Optional[str] = None
+
+    class Row(msgspec.Struct):
+        pattern_type: str = 'unknown'
+        timeframe: Optional[str] = None
+        instruction: str = ''
+        response: str = ''
+        metadata: Optional[Metadata] = None
+
+    decoder = msgspec.json.Decoder(Row)
+
+    def decode(line: bytes) -> RowFields:
+        row = decoder.decode(line)
+        template = row.metadata.template if row.metadata else None
+        return row.pattern_type, row.timeframe, template, len(row.instruction), len(row.response)
+    return decode
+
+
+def row_decoder() -> Callable[[bytes], RowFields]:
+    """Return the fastest available field extractor."""
+    try:
+        return _msgspec_decoder()
+    except ImportError:
+        return _generic_decoder()
+
+
+def length_bucket(length: int) -> str:
+    """Histogram label for a text length, e.g. ``"128-255"`` or ``"2048+"``."""
+    lower = 0
+    for upper in LENGTH_BUCKETS:
+        if length < upper:
+            return f"{lower}-{upper - 1}"
+        lower = upper
+    return f"{lower}+"
+
+
+BUCKET_LABELS = [length_bucket(upper - 1) for upper in LENGTH_BUCKETS] + [length_bucket(LENGTH_BUCKETS[-1])]
+
+
+def empty_report() -> Dict:
+    """Aggregates collected by :func:`scan_range`."""
+    return {
+        'total': 0,
+        'unparseable': 0,
+        'instruction_chars': 0,
+        'response_chars': 0,
+        'patterns': Counter(),
+        'timeframes': Counter(),
+        'templates': Counter(),
+        'instruction_lengths': Counter(),
+        'response_lengths': Counter(),
+    }
+
+
+def scan_lines(lines: Iterable[bytes]) -> Dict:
+    """Aggregate stats for raw JSONL lines."""
+    report = empty_report()
+    decode = row_decoder()
+    patterns, timeframes, templates = report['patterns'], report['timeframes'], report['templates']
+    instruction_lengths, response_lengths = report['instruction_lengths'], report['response_lengths']
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            pattern, timeframe, template, instruction_len, response_len = decode(line)
+        except Exception:
+            report['unparseable'] += 1
+            continue
+        report['total'] += 1
+        patterns[pattern] += 1
+        if timeframe:
+            timeframes[timeframe] += 1
+        if template:
+            templates[template] += 1
+        report['instruction_chars'] += instruction_len
+        report['response_chars'] += response_len
+        instruction_lengths[length_bucket(instruction_len)] += 1
+        response_lengths[length_bucket(response_len)] += 1
+    return report
+
+
+def _mmap_lines(mm: mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    pos = start
+    while pos < end:
+        newline = mm.find(b'\n', pos, end)
+        if newline == -1:
+            newline = end
+        yield mm[pos:newline]
+        pos = newline + 1
+
+
+def scan_range(path: str, start: int, end: int) -> Dict:
+    """Aggregate stats for the rows in byte range ``[start, end)`` of ``path``."""
+    if end <= start:
+        return empty_report()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return scan_lines(_mmap_lines(mm, start, end))
+
+
+def merge_stats(reports: List[Dict]) -> Dict:
+    """Sum per-chunk reports into one."""
+    merged = empty_report()
+    for report in reports:
+        for key, value in report.items():
+            merged[key] += value
+    return merged
+
+
+def compute_stats(path: str, workers: int = 1) -> Dict:
+    """Compute dataset statistics in one pass, optionally in parallel chunks.
+
+    Besides the merged aggregates, the report includes
+    ``estimated_tokens`` (all instruction and response text at
+    :data:`CHARS_PER_TOKEN` characters per token).
+
+    Compressed files cannot be memory-mapped; they are decompressed in
+    this process and scanned in batches of lines by the workers.
+    """
+    if compression_for(path):
+        if workers <= 1:
+            report = scan_lines(iter_lines(path))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                report = merge_stats(list(map_line_batches(pool, scan_lines, path)))
+    elif workers <= 1:
+        report = scan_range(path, 0, os.path.getsize(path))
+    else:
+        ranges = split_ranges(path, workers * 4)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan_range, path, start, end) for start, end in ranges]
+            report = merge_stats([future.result() for future in futures])
+    report['estimated_tokens'] = (report['instruction_chars'] + report['response_chars']) // CHARS_PER_TOKEN
+    return report
@@ -0,0 +1,74 @@
+"""Chunked, parallel dataset validation."""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from src.schemas import TrainingExample
+from src.serialization import compression_for, iter_lines, iter_range_lines, map_line_batches, split_ranges
+
+# Compiled once per process; validates raw JSON bytes without a Python dict hop
+EXAMPLE_ADAPTER = TypeAdapter(TrainingExample)
+
+# Chunks per worker, so one slow chunk does not leave other workers idle
+CHUNKS_PER_WORKER = 4
+
+
+def validate_lines(lines: Iterable[bytes], max_errors: int = 50) -> Dict:
+    """Validate JSONL lines and return a report.
+
+    The report has ``lines`` (physical lines read, blank ones included),
+    ``total`` (non-blank rows), ``valid``, ``error_count`` and ``errors``,
+    a list of at most ``max_errors`` ``(line_number, message)`` pairs with
+    1-based line numbers relative to the first line given.
+    """
+    report = {'lines': 0, 'total': 0, 'valid': 0, 'error_count': 0, 'errors': []}
+    validate_json = EXAMPLE_ADAPTER.validate_json
+    for number, line in enumerate(lines, 1):
+        report['lines'] = number
+        if not line.strip():
+            continue
+        report['total'] += 1
+        try:
+            validate_json(line)
+            report['valid'] += 1
+        except ValidationError as e:
+            report['error_count'] += 1
+            if len(report['errors']) < max_errors:
+                report['errors'].append((number, str(e)))
+    return report
+
+
+def _validate_range(path: str, start: int, end: int, max_errors: int) -> Dict:
+    """Process-pool entry point: validate one byte range of a file."""
+    return validate_lines(iter_range_lines(path, start, end), max_errors)
+
+
+def merge_reports(reports: List[Dict], max_errors: int = 50) -> Dict:
+    """Merge per-chunk reports (in file order), shifting line numbers."""
+    merged = {'lines': 0, 'total': 0, 'valid': 0, 'error_count': 0, 'errors': []}
+    for report in reports:
+        offset = merged['lines']
+        for key in ('lines', 'total', 'valid', 'error_count'):
+            merged[key] += report[key]
+        room = max_errors - len(merged['errors'])
+        merged['errors'].extend((offset + number, message) for number, message in report['errors'][:room])
+    return merged
+
+
+def validate_file(path: str, workers: int = 1, max_errors: int = 50) -> Dict:
+    """Validate a JSONL file, splitting it into byte ranges across ``workers`` processes.
+
+    Compressed files are decompressed in this process and validated in
+    batches of lines by the workers.
+    """
+    if workers <= 1:
+        return validate_lines(iter_lines(path), max_errors)
+    if compression_for(path):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return merge_reports(list(map_line_batches(pool, validate_lines, path, max_errors)), max_errors)
+
+    ranges: List[Tuple[int, int]] = split_ranges(path, workers * CHUNKS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_validate_range, path, start, end, max_errors) for start, end in ranges]
+        return merge_reports([future.result() for future in futures], max_errors)
@@ -0,0 +1,76 @@
+"""Request validation in the Flask API."""
+import io
+import os
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def client():
+    return api.app.test_client()
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'size': 10, 'shards': 0}, 'shards'),
+    ({'size': 10, 'shards': api.MAX_GENERATE_SHARDS + 1}, 'shards'),
+    ({'size': 10, 'workers': 0}, 'workers'),
+    ({'size': 10, 'workers': 'many'}, 'invalid literal'),
+    ({'size': 0}, 'size'),
+    ({'size': 10, 'seed': -1}, 'seed'),
+    ({'size': 10, 'seed': api.MAX_SEED + 1}, 'seed'),
+    ({'size': 10, 'balance': False, 'pine_weight': -5}, 'weights'),
+])
+def test_generate_rejects_bad_parameters(client, body, error):
+    response = client.post('/api/generate', json=body)
+    assert response.status_code == 400
+    assert error in response.get_json()['error']
+
+
+def test_workers_are_capped_at_cpu_count():
+    assert api._worker_count({'workers': 10 ** 6}) == (os.cpu_count() or 1)
+    assert api._pool_size({'shards': '2', 'workers': '1'}) == (2, 1)
+
+
+@pytest.mark.parametrize('query', ['size=abc', 'size=-5', 'size=5&seed=-1', f'size=5&seed={2 ** 70}',
+                                   'size=5&format=xml'])
+def test_stream_rejects_bad_parameters(client, query):
+    assert client.get(f'/api/stream?{query}').status_code == 400
+
+
+def test_stream_rows(client):
+    response = client.get('/api/stream?size=30&seed=3')
+    assert response.status_code == 200
+    assert len(response.data.splitlines()) == int(response.headers['X-Total-Rows'])
+
+
+@pytest.mark.parametrize('query', ['num_bars=0', f'num_bars={api.MAX_PREVIEW_BARS + 1}', 'n=0',
+                                   f'n={api.MAX_PREVIEW_SAMPLES + 1}', 'pattern=engulfing&num_bars=1'])
+def test_ohlc_preview_rejects_bad_parameters(client, query):
+    assert client.get(f'/api/preview/ohlc?{query}').status_code == 400
+
+
+def test_ohlc_preview_series(client):
+    body = client.get('/api/preview/ohlc?num_bars=20&n=3&seed=5').get_json()
+    assert list(body) == ['pattern', 'seed', 'n', 'series']
+    assert [len(series) for series in body['series']] == [20, 20, 20]
+
+
+def test_preview_cache_is_bounded():
+    before = api._preview_ohlc_batch('random_walk', 5, 1, 1)
+    # Each of these is about 5 MB, so a few push the first entry out
+    for seed in range(2, 10):
+        api._preview_ohlc_batch('random_walk', api.MAX_PREVIEW_BARS, seed, api.MAX_PREVIEW_SAMPLES)
+    entries = next(cell.cell_contents for cell in api._preview_ohlc_batch.__closure__
+                   if isinstance(cell.cell_contents, dict))
+    assert sum(len(body) for body in entries.values()) <= api.PREVIEW_CACHE_BYTES
+    assert ('random_walk', 5, 1, 1) not in entries
+    assert api._preview_ohlc_batch('random_walk', 5, 1, 1) is not before
+
+
+@pytest.mark.parametrize('workers', ['0', '-2', 'x'])
+def test_validate_rejects_bad_workers(client, workers):
+    response = client.post('/api/validate', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(b'{}\n'), 'rows.jsonl'), 'workers': workers})
+    assert response.status_code == 400
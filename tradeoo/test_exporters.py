@@ -0,0 +1,66 @@
+"""Round trips through the Parquet/Arrow table writer."""
+import pytest
+
+from src.engine import generate_to_file, iter_samples
+from src.exporters.arrow import TableWriter
+from src.serialization import iter_jsonl, loads
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.parquet as pq  # noqa: E402
+
+DISTRIBUTION = {'pinescript': 20, 'price_action': 20, 'institutional': 20}
+
+
+def _rows():
+    return list(iter_samples(DISTRIBUTION, 11, '2024-01-01T00:00:00'))
+
+
+def _read(path, table_format):
+    if table_format == 'arrow':
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).read_all()
+    return pq.read_table(str(path))
+
+
+@pytest.mark.parametrize('table_format', ['parquet', 'arrow'])
+def test_mixed_categories_small_row_groups(tmp_path, table_format):
+    # Row groups of 7 leave some dictionary columns all-null in early batches
+    rows = _rows()
+    path = tmp_path / f'rows.{table_format}'
+    with TableWriter(str(path), row_group_rows=7) as writer:
+        assert writer.write_all(rows) == len(rows)
+
+    table = _read(path, table_format)
+    assert table.num_rows == len(rows)
+    for name in ('id', 'instruction', 'response', 'pattern_type', 'timeframe', 'ticker', 'seed'):
+        assert table.column(name).to_pylist() == [row.get(name) for row in rows]
+    assert table.column('template').to_pylist() == [row['metadata'].get('template') for row in rows]
+    assert [loads(value) for value in table.column('metadata').to_pylist()] == [row['metadata'] for row in rows]
+
+
+def test_null_dictionary_column_then_values(tmp_path):
+    path = tmp_path / 'rows.arrow'
+    rows = _rows()
+    with_timeframe = [row for row in rows if row.get('timeframe')]
+    without = [dict(row, timeframe=None) for row in rows[:5]]
+    with TableWriter(str(path), row_group_rows=5) as writer:
+        writer.write_all(without + with_timeframe)
+
+    timeframes = _read(path, 'arrow').column('timeframe').to_pylist()
+    assert timeframes == [None] * 5 + [row['timeframe'] for row in with_timeframe]
+
+
+@pytest.mark.parametrize('table_format', ['parquet', 'arrow'])
+def test_generate_table_matches_jsonl(tmp_path, table_format):
+    distribution = {'pinescript': 300, 'price_action': 300, 'institutional': 300}
+    jsonl = tmp_path / 'rows.jsonl'
+    table = tmp_path / f'rows.{table_format}'
+    for path in (jsonl, table):
+        generate_to_file(distribution, 3, str(path), created_at='2024-01-01T00:00:00')
+
+    rows = list(iter_jsonl(str(jsonl)))
+    columns = _read(table, table_format).to_pydict()
+    assert columns['id'] == [row['id'] for row in rows]
+    assert columns['pattern_type'] == [row['pattern_type'] for row in rows]
+    assert columns['timeframe'] == [row.get('timeframe') for row in rows]
+    assert [loads(value) for value in columns['metadata']] == [row['metadata'] for row in rows]
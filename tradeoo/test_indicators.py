@@ -0,0 +1,259 @@
+"""Indicators and their readings checked against bar-by-bar scalar references.
+
+The references follow PineScript's ``ta.*`` definitions literally. Where
+two compared series are equal up to float rounding (e.g. both EMAs on their
+seed bar) the reference marks the signal as ``None``, since either answer
+is a faithful result of the same maths.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from src.engine import iter_samples
+from src.generators.ohlc import BAR_SECONDS
+from src.indicators import (EMA, RSI, SESSION_SECONDS, VWAP, Bollinger, bollinger, ema, rsi,
+                            session_ids, vwap)
+from src.readings import (BAR_BANK_BARS, EVALUATORS, HTF_MINUTES, MAX_SIGNALS, add_readings,
+                          bar_bank)
+
+NAN = float('nan')
+
+# Relative difference below which two values count as a tie
+TIE = 1e-9
+
+
+def ref_ema(values, length):
+    alpha, out, value = 2 / (length + 1), [], None
+    for x in values:
+        value = x if value is None else alpha * x + (1 - alpha) * value
+        out.append(value)
+    return out
+
+
+def ref_rma(values, length):
+    out, value = [], None
+    for i, x in enumerate(values):
+        if i == length - 1:
+            value = sum(values[:length]) / length
+        elif i >= length:
+            value = (x + (length - 1) * value) / length
+        out.append(NAN if value is None else value)
+    return out
+
+
+def ref_rsi(close, length):
+    changes = [b - a for a, b in zip(close, close[1:])]
+    gains = ref_rma([max(c, 0.0) for c in changes], length)
+    losses = ref_rma([max(-c, 0.0) for c in changes], length)
+    return [NAN] + [100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+                    for gain, loss in zip(gains, losses)]
+
+
+def ref_bollinger(close, length, mult):
+    basis, upper, lower = [], [], []
+    for i in range(len(close)):
+        if i < length - 1:
+            mean = deviation = NAN
+        else:
+            window = close[i - length + 1:i + 1]
+            mean = sum(window) / length
+            deviation = mult * math.sqrt(sum((x - mean) ** 2 for x in window) / length)
+        basis.append(mean)
+        upper.append(mean + deviation)
+        lower.append(mean - deviation)
+    return basis, upper, lower
+
+
+def ref_vwap(close, volume, timestamps):
+    out, session, weighted, volumes = [], None, 0.0, 0.0
+    for price, size, ts in zip(close, volume, timestamps):
+        if ts // SESSION_SECONDS != session:
+            session, weighted, volumes = ts // SESSION_SECONDS, 0.0, 0.0
+        weighted += price * size
+        volumes += size
+        out.append(weighted / volumes if volumes > 0 else NAN)
+    return out
+
+
+def _spread(x, y):
+    """``x - y``, or ``None`` when the two are tied up to rounding."""
+    if not (math.isnan(x) or math.isnan(y)) and abs(x - y) <= TIE * max(1.0, abs(x), abs(y)):
+        return None
+    return x - y
+
+
+def _gt(x, y):
+    spread = _spread(x, y)
+    return None if spread is None else spread > 0
+
+
+def _all(*flags):
+    if False in flags:
+        return False
+    return None if None in flags else True
+
+
+def _side(buy, sell):
+    return None if buy is None or sell is None else int(buy) - int(sell)
+
+
+def ref_cross(a, b):
+    """``ta.crossover`` (+1) / ``ta.crossunder`` (-1) per bar."""
+    out, previous = [], NAN
+    for x, y in zip(a, b):
+        spread = _spread(x, y)
+        if spread is None or previous is None:
+            out.append(None)
+        else:
+            out.append(int(spread > 0 and previous <= 0) - int(spread < 0 and previous >= 0))
+        previous = spread
+    return out
+
+
+def reference(template, params, bars):
+    """``(values, signals)`` for one row, computed bar by bar."""
+    close, n = bars['close'], len(bars['close'])
+
+    def blank(series, length):
+        return [NAN] * n if length > BAR_BANK_BARS else series
+
+    if template == 'EMA_Crossover':
+        fast = blank(ref_ema(close, params['fast_len']), params['fast_len'])
+        slow = blank(ref_ema(close, params['slow_len']), params['slow_len'])
+        return {'fast_ema': fast, 'slow_ema': slow}, ref_cross(fast, slow)
+    if template == 'RSI_EMA':
+        strength = blank(ref_rsi(close, params['rsi_len']), params['rsi_len'])
+        trend = blank(ref_ema(close, params['ema_len']), params['ema_len'])
+        up = ref_cross(strength, [params['oversold']] * n)
+        down = ref_cross(strength, [params['overbought']] * n)
+        signals = [_side(None if u is None else _all(u == 1, _gt(c, t)),
+                         None if d is None else _all(d == -1, _gt(t, c)))
+                   for u, d, c, t in zip(up, down, close, trend)]
+        return {'rsi': strength, 'ema': trend}, signals
+    if template == 'Bollinger_Breakout':
+        bands = [blank(band, params['bb_len'])
+                 for band in ref_bollinger(close, params['bb_len'], params['bb_mult'])]
+        signals = [_side(None if u is None else u == 1, None if l is None else l == -1)
+                   for u, l in zip(ref_cross(close, bands[1]), ref_cross(close, bands[2]))]
+        return dict(zip(('basis', 'upper', 'lower'), bands)), signals
+    if template == 'VWAP_Scalper':
+        value = ref_vwap(close, bars['volume'], bars['timestamp'])
+        return {'vwap': value}, ref_cross(close, value)
+    if template == 'Multi_Timeframe':
+        htf_len = params['htf_len'] * HTF_MINUTES[params['htf']] * 60 // BAR_SECONDS
+        htf_ema = blank(ref_ema(close, htf_len), htf_len)
+        strength = blank(ref_rsi(close, params['rsi_len']), params['rsi_len'])
+        signals, previous = [], 0
+        for c, h, r in zip(close, htf_ema, strength):
+            state = _side(_all(_gt(c, h), _gt(30, r)), _all(_gt(h, c), _gt(r, 70)))
+            if state is None or previous is None:
+                signals.append(None)
+            else:
+                signals.append(state if state != previous else 0)
+            previous = state
+        return {'htf_ema': htf_ema, 'rsi': strength}, signals
+    raise AssertionError(template)
+
+
+def _assert_series(actual, expected):
+    np.testing.assert_allclose(actual, np.array(expected, dtype=np.float64), rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture(scope='module')
+def walk():
+    """Three random-walk series with volumes and 5-minute timestamps across three sessions."""
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 1, (3, 600)), axis=1)
+    volume = rng.integers(1, 1000, (3, 600)).astype(np.float64)
+    timestamps = 1704067200 + BAR_SECONDS * np.arange(600)
+    return close, volume, timestamps
+
+
+def test_indicators_match_scalar_reference(walk):
+    close, volume, timestamps = walk
+    lengths = np.array([5, 14, 50])
+    basis, upper, lower = bollinger(close, lengths, 2.5)
+    for i, length in enumerate(lengths.tolist()):
+        series = close[i].tolist()
+        _assert_series(ema(close, lengths)[i], ref_ema(series, length))
+        _assert_series(rsi(close, lengths)[i], ref_rsi(series, length))
+        for actual, expected in zip((basis, upper, lower), ref_bollinger(series, length, 2.5)):
+            _assert_series(actual[i], expected)
+        _assert_series(vwap(close, volume, timestamps)[i],
+                       ref_vwap(series, volume[i].tolist(), timestamps.tolist()))
+
+
+def test_chunked_updates_match_one_call(walk):
+    close, volume, timestamps = walk
+    lengths = np.array([5, 14, 50])
+    sessions = session_ids(timestamps)
+    indicators = [EMA(lengths), RSI(lengths), Bollinger(lengths)]
+    chunks = [[] for _ in indicators]
+    prices = VWAP()
+    vwap_chunks = []
+    for start, end in ((0, 1), (1, 37), (37, 300), (300, 600)):
+        for indicator, out in zip(indicators, chunks):
+            out.append(indicator.update(close[:, start:end]))
+        vwap_chunks.append(prices.update(close[:, start:end], volume[:, start:end], sessions[start:end]))
+
+    _assert_series(np.concatenate(chunks[0], axis=1), ema(close, lengths))
+    _assert_series(np.concatenate(chunks[1], axis=1), rsi(close, lengths))
+    for band, whole in enumerate(bollinger(close, lengths)):
+        _assert_series(np.concatenate([chunk[band] for chunk in chunks[2]], axis=1), whole)
+    _assert_series(np.concatenate(vwap_chunks, axis=1), vwap(close, volume, timestamps))
+
+
+@pytest.fixture(scope='module')
+def rows():
+    rows = list(iter_samples({'pinescript': 150}, 5, '2024-01-01T00:00:00'))
+    assert add_readings(rows) == len(rows)
+    return rows
+
+
+def _bars(series):
+    return {field: values[[series]] for field, values in bar_bank().items()}
+
+
+def test_values_match_scalar_reference(rows):
+    for row in rows:
+        metadata, readings = row['metadata'], row['metadata']['readings']
+        bars = {field: values[0].tolist() for field, values in _bars(readings['series']).items()}
+        values, _ = reference(metadata['template'], metadata['params'], bars)
+
+        expected = {'close': bars['close'][-1]}
+        expected.update((name, series[-1]) for name, series in values.items())
+        assert set(readings['values']) == set(expected)
+        for name, value in expected.items():
+            if math.isnan(value):
+                assert readings['values'][name] is None, name
+            else:
+                assert readings['values'][name] == pytest.approx(value, abs=0.011), name
+
+
+def test_signals_match_scalar_reference(rows):
+    for row in rows:
+        metadata, readings = row['metadata'], row['metadata']['readings']
+        bars = _bars(readings['series'])
+        _, signals = EVALUATORS[metadata['template']](bars, [metadata['params']])
+        signals = signals[0].tolist()
+        _, expected = reference(metadata['template'], metadata['params'],
+                                {field: values[0].tolist() for field, values in bars.items()})
+        assert [s for s, e in zip(signals, expected) if e is not None] == \
+            [e for e in expected if e is not None], metadata['template']
+
+        times = bars['timestamp'][0].astype('datetime64[s]').astype(str)
+        hits = [{'time': times[i], 'side': 'buy' if side > 0 else 'sell'}
+                for i, side in enumerate(signals) if side]
+        assert readings['signal_count'] == len(hits)
+        assert readings['signals'] == hits[-MAX_SIGNALS:]
+
+
+def test_lookbacks_past_the_bank_have_no_reading(rows):
+    too_long = [row for row in rows if row['metadata']['template'] == 'Multi_Timeframe'
+                and row['metadata']['params']['htf'] in ('240', 'D')]
+    assert too_long
+    for row in too_long:
+        readings = row['metadata']['readings']
+        assert readings['values']['htf_ema'] is None
+        assert readings['signals'] == [] and readings['signal_count'] == 0